@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the wall-clock cost of importing carmine in a fresh interpreter,
+both for the rule-application path (`Rule`/`RuleList` only) and for the full
+set of miners.
+
+Usage:
+    python benchmarks/import_time.py [repeats]
+"""
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import os
+import subprocess
+import sys
+import timeit
+
+here = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+STATEMENTS = [
+    ("bare interpreter", "pass"),
+    ("import carmine", "import carmine"),
+    ("rules only", "from carmine import Rule, RuleList"),
+    ("all miners", "from carmine import MECRTree, PrimeMBA, "
+                   "DecisionTreeRuleExtractor"),
+]
+
+
+def time_import(statement, repeats):
+    cmd = [sys.executable, "-c", statement]
+
+    def run():
+        subprocess.check_call(cmd, cwd=here)
+
+    return min(timeit.repeat(run, number=1, repeat=repeats))
+
+
+def main(repeats=5):
+    for label, statement in STATEMENTS:
+        elapsed = time_import(statement, repeats)
+        print("{:<20} {:8.1f} ms".format(label, elapsed * 1000))
+
+
+if __name__ == "__main__":
+    main(*[int(a) for a in sys.argv[1:]])
@@ -5,7 +5,56 @@ from __future__ import (
     unicode_literals
 )
 
-from .mecr import MECRTree
-from .prime import PrimeMBA
-from .rule import Rule, RuleList
-from .tree import DecisionTreeRuleExtractor
+import importlib
+import sys
+
+# public names and the submodules that provide them; submodules are only
+# imported when one of their names is first accessed, so that applying saved
+# rules does not pull in pandas, scikit-learn or sympy
+_LAZY_NAMES = {
+    "MECRTree": "mecr",
+    "PrimeMBA": "prime",
+    "Rule": "rule",
+    "RuleClassifier": "classifier",
+    "RuleList": "rule",
+    "DecisionTreeRuleExtractor": "tree",
+}
+
+# submodules, which are also imported on first access as attributes
+_SUBMODULES = (
+    "classifier",
+    "coverage",
+    "data",
+    "mecr",
+    "prime",
+    "rule",
+    "tree",
+)
+
+__all__ = sorted(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    try:
+        module = _LAZY_NAMES[name]
+    except KeyError:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULES))
+
+
+# module-level __getattr__ needs Python 3.7 (PEP 562)
+if sys.version_info < (3, 7):
+    from .mecr import MECRTree  # NOQA
+    from .prime import PrimeMBA  # NOQA
+    from .rule import Rule, RuleList  # NOQA
+    from .classifier import RuleClassifier  # NOQA
+    from .tree import DecisionTreeRuleExtractor  # NOQA
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Construction of a compact rule-based classifier from a set of mined class
+association rules, using the database coverage heuristic of CBA.
+
+Recommended reading:
+    1.) "Integrating Classification and Association Rule Mining"
+        Liu, Hsu, Ma. (KDD, 1998).
+"""
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import numpy as np
+
+from carmine.coverage import CoverageIndex, rule_classes
+
+
+class RuleClassifier(object):
+    """
+    Ordered rule list classifier with a default class (CBA-CB, "M1").
+
+    Candidate rules are ranked by `score` (ties broken in favour of shorter
+    rules), and a sequential covering pass over the training data keeps each
+    rule that correctly classifies at least one object not already covered
+    by a higher-ranked rule. The rule list is then cut where the total number
+    of training errors (including the default class) is lowest. Rule coverage
+    is computed with packed row bitmaps, so each candidate costs a handful of
+    word-wise operations rather than a Python loop over the rows.
+
+    Args:
+        rules (:obj:`carmine.rule.RuleList`): Candidate rules.
+        feature_names (:obj:`list`): Names of the features, as used in rule
+            conditions (default: column indices as strings).
+
+    Attributes:
+        rules (:obj:`list`): The selected rules, in order of precedence.
+        rule_classes (:obj:`list`): The class label predicted by each of
+            the selected rules.
+        default_class: The class predicted when no rule matches.
+        errors (int): Training errors made by the classifier.
+    """
+    def __init__(self, rules, feature_names=None):
+        self.candidates = sorted(
+            rules,
+            key=lambda rule: (rule.score, -len(rule)),
+            reverse=True
+        )
+        self.feature_names = feature_names
+        self.rules = None
+        self.rule_classes = None
+        self.default_class = None
+        self.classes = None
+        self.errors = None
+
+    def train(self, X, y, classes=None):
+        """
+        Select rules by database coverage of the training data.
+
+        Arguments:
+            X (:obj:`numpy.array`): An array containing a categorical dataset.
+            y (:obj:`numpy.array`): An array containing class labels.
+            classes (:obj:`list`): Class labels, indexed by the rules'
+                classifications, for rules that carry class indices (such as
+                `DecisionTreeRuleExtractor.classes`) (default: None).
+
+        Raises:
+            ValueError: If a rule predicts a class that isn't in `y` (or,
+                with `classes`, isn't a class index).
+        """
+        y = np.asarray(y).ravel()
+        labels = rule_classes(self.candidates, y, classes)
+        index = CoverageIndex(X, self.feature_names)
+        classes, counts = np.unique(y, return_counts=True)
+        class_bitmaps = {c: index.pack(y == c) for c in classes}
+        self.classes = classes
+
+        # state with no rules: everything falls through to the default
+        remaining = index.full()
+        rule_errors = 0
+        best_errors = y.size - counts.max()
+        best_length = 0
+        best_default = classes[np.argmax(counts)]
+
+        selected = []
+        for rule, label in zip(self.candidates, labels):
+            # (a class index from `classes` may be absent from `y`)
+            class_bitmap = class_bitmaps.get(label)
+            if class_bitmap is None:
+                continue
+
+            # coverage is sparse, so only count the non-empty words
+            covered = index.rule(rule, within=remaining)
+            words = np.flatnonzero(covered)
+            covered = covered[words]
+            n_correct = index.count(covered & class_bitmap[words])
+            if n_correct == 0:
+                continue
+
+            # keep the rule and drop the objects it covers
+            selected.append((rule, label))
+            n_covered = index.count(covered)
+            rule_errors += n_covered - n_correct
+            remaining[words] &= ~covered
+
+            # majority class of what is left becomes the default class
+            for i, c in enumerate(classes):
+                counts[i] -= index.count(covered & class_bitmaps[c][words])
+            n_remaining = counts.sum()
+            if n_remaining > 0:
+                default = classes[np.argmax(counts)]
+                default_errors = n_remaining - counts.max()
+            else:
+                default = label
+                default_errors = 0
+
+            total_errors = rule_errors + default_errors
+            if total_errors < best_errors:
+                best_errors = total_errors
+                best_length = len(selected)
+                best_default = default
+
+            if n_remaining == 0:
+                break
+
+        self.rules = [rule for rule, _ in selected[:best_length]]
+        self.rule_classes = [label for _, label in selected[:best_length]]
+        self.default_class = best_default
+        self.errors = int(best_errors)
+
+    def predict(self, X):
+        """
+        Classify objects with the first matching rule, falling back to the
+        default class.
+
+        Arguments:
+            X (:obj:`numpy.array`): An array containing a categorical dataset.
+
+        Returns:
+            (:obj:`numpy.array`): Predicted class labels.
+        """
+        index = CoverageIndex(X, self.feature_names)
+        labels = self.rule_classes + [self.default_class]
+        predictions = np.empty(index.n_objs, dtype=np.asarray(labels).dtype)
+        predictions[:] = self.default_class
+
+        unassigned = index.full()
+        for rule, label in zip(self.rules, self.rule_classes):
+            covered = index.rule(rule, within=unassigned)
+            predictions[index.unpack(covered)] = label
+            unassigned &= ~covered
+        return predictions
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Packed row bitmaps for measuring which objects in a categorical dataset are
+covered by rule conditions.
+
+Each distinct (feature, value) item is encoded once as a bitmap over the rows
+of the dataset (one bit per object, packed into 64-bit words), so that rule
+coverage reduces to word-wise AND/NOT operations and population counts.
+"""
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import numpy as np
+
+from carmine.data import as_columns
+from carmine.rule import Rule
+
+# number of set bits in every possible byte
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype="uint8")
+
+# native population count ufunc (numpy >= 2.0)
+_bitwise_count = getattr(np, "bitwise_count", None)
+
+
+class CoverageIndex(object):
+    """
+    Lazily built (feature, value) -> bitmap index over a categorical dataset.
+
+    Values are matched on their string representation, so rules produced by
+    both `MECRTree` (decoded values) and `DecisionTreeRuleExtractor`
+    (stringified values) can be applied to the raw data.
+
+    Args:
+        X: A 2-D array (or memmap), DataFrame, pyarrow Table or mapping of
+            columns containing a categorical dataset.
+        feature_names (:obj:`list`): Names of the features, as used in rule
+            conditions (default: column names, or indices, as strings).
+
+    Attributes:
+        n_objs (int): The number of objects in the dataset.
+        n_words (int): The number of 64-bit words in each bitmap.
+    """
+    def __init__(self, X, feature_names=None):
+        self.X = as_columns(X)
+        self.n_objs = self.X.n_rows
+        self.n_words = (self.n_objs + 63) // 64
+
+        self.feature_index = {
+            str(name): i
+            for i, name in enumerate(self.X.feature_names(feature_names))
+        }
+
+        self._codes = {}
+        self._items = {}
+        self._full = None
+
+    def pack(self, mask):
+        """
+        Pack a boolean row mask into a bitmap. Padding bits are zero.
+        """
+        packed = np.zeros(self.n_words * 8, dtype="uint8")
+        bits = np.packbits(np.asarray(mask, dtype=bool))
+        packed[:bits.size] = bits
+        return packed.view("uint64")
+
+    def unpack(self, bitmap):
+        """
+        Unpack a bitmap into a boolean row mask.
+        """
+        bits = np.unpackbits(bitmap.view("uint8"))
+        return bits[:self.n_objs].astype(bool)
+
+    @staticmethod
+    def count(bitmap):
+        """
+        Count the objects set in a bitmap.
+        """
+        if not bitmap.any():
+            return 0
+        if _bitwise_count is not None:
+            return int(_bitwise_count(bitmap).sum(dtype="int64"))
+        return int(_POPCOUNT[bitmap.view("uint8")].sum(dtype="int64"))
+
+    def full(self):
+        """
+        Return a bitmap covering every object.
+        """
+        if self._full is None:
+            self._full = self.pack(np.ones(self.n_objs, dtype=bool))
+        return self._full.copy()
+
+    def _column_codes(self, feature):
+        if feature not in self._codes:
+            column = self.X.column(self.feature_index[feature])
+            try:
+                uniques, codes = np.unique(column, return_inverse=True)
+            except TypeError:
+                # mixed types in an object column can't be ordered
+                uniques, codes = np.unique(column.astype(str),
+                                           return_inverse=True)
+            lookup = {str(value): i for i, value in enumerate(uniques)}
+            self._codes[feature] = (lookup, codes.reshape(-1))
+        return self._codes[feature]
+
+    def item(self, feature, value):
+        """
+        Return the bitmap of objects where `feature` equals `value`.
+        """
+        key = (str(feature), str(value))
+        if key not in self._items:
+            if key[0] in self.feature_index:
+                lookup, codes = self._column_codes(key[0])
+                code = lookup.get(key[1])
+            else:
+                code = None
+
+            if code is None:
+                bitmap = np.zeros(self.n_words, dtype="uint64")
+            else:
+                bitmap = self.pack(codes == code)
+            self._items[key] = bitmap
+        return self._items[key]
+
+    def rule(self, rule, within=None):
+        """
+        Return the bitmap of objects matching every condition of a rule,
+        optionally restricted to the objects set in `within`.
+        """
+        bitmap = self.full() if within is None else within.copy()
+        for feature, rule_part in rule.conditions.items():
+            for relation, value in rule_part:
+                if relation == Rule.EQ:
+                    bitmap &= self.item(feature, value)
+                else:
+                    bitmap &= ~self.item(feature, value)
+        return bitmap
+
+
+def rule_classes(rules, y, classes=None):
+    """
+    Return the class label predicted by each rule, as found in `y`.
+
+    Rules carry either class labels or, like those of a
+    `DecisionTreeRuleExtractor` without `class_names`, class indices; the
+    latter are mapped to labels through `classes`.
+
+    Args:
+        rules: The rules.
+        y (:obj:`numpy.array`): An array containing class labels.
+        classes (:obj:`list`): Class labels, indexed by the rules'
+            classifications (default: None, i.e. rules carry labels).
+
+    Raises:
+        ValueError: If a rule's class isn't a class index (with `classes`)
+            or a label in `y` (without).
+    """
+    if classes is not None:
+        classes = list(classes)
+        labels = []
+        for rule in rules:
+            c = rule.classification
+            if not (isinstance(c, (int, np.integer)) and
+                    0 <= c < len(classes)):
+                raise ValueError(
+                    "Rule class {!r} is not an index into classes".format(c))
+            labels.append(classes[c])
+        return labels
+
+    known = set(np.unique(np.asarray(y)).tolist())
+    labels = [rule.classification for rule in rules]
+    for label in labels:
+        if label not in known:
+            raise ValueError(
+                "Rule class {!r} is not a class in y (pass classes if the "
+                "rules carry class indices)".format(label))
+    return labels
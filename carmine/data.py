@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Column-oriented access to input datasets, so that miners can read a dataset
+one column at a time instead of copying it as a whole.
+
+Supported inputs are 2-D NumPy arrays (including `numpy.memmap`), pandas
+DataFrames, pyarrow Tables and mappings of column names to 1-D arrays.
+"""
+from __future__ import (
+    absolute_import,
+    division,
+    print_function,
+    unicode_literals
+)
+
+import numpy as np
+
+
+class Columns(object):
+    """
+    Read-only, column-oriented view of a 2-D categorical dataset.
+
+    Columns of NumPy arrays and DataFrames are returned as views wherever
+    possible; other inputs are converted one column at a time on access.
+
+    Args:
+        X: A 2-D array, DataFrame, pyarrow Table or mapping of columns.
+
+    Attributes:
+        names (:obj:`list`): Column names, or None if the input has none.
+        n_rows (int): The number of rows (objects) in the dataset.
+        n_cols (int): The number of columns (features) in the dataset.
+    """
+    def __init__(self, X):
+        self.X = X
+        if hasattr(X, "column_names") and hasattr(X, "column"):
+            # pyarrow.Table
+            self.names = list(X.column_names)
+            self.n_rows = X.num_rows
+            self._get = lambda j: X.column(j).to_numpy()
+        elif hasattr(X, "columns") and hasattr(X, "iloc"):
+            # pandas.DataFrame
+            self.names = list(X.columns)
+            self.n_rows = X.shape[0]
+            self._get = lambda j: X.iloc[:, j].to_numpy()
+        elif hasattr(X, "keys") and not isinstance(X, np.ndarray):
+            # mapping of names to columns
+            self.names = list(X.keys())
+            cols = [X[name] for name in self.names]
+            self.n_rows = len(cols[0]) if cols else 0
+            self._get = lambda j: np.asarray(cols[j])
+        else:
+            X = X if isinstance(X, np.ndarray) else np.asarray(X)
+            self.names = None
+            self.n_rows = X.shape[0]
+            self._get = lambda j: X[:, j]
+            self.X = X
+
+        if self.names is not None:
+            self.n_cols = len(self.names)
+        else:
+            self.n_cols = self.X.shape[1]
+
+    @property
+    def shape(self):
+        return (self.n_rows, self.n_cols)
+
+    def column(self, j):
+        """
+        Return column `j` as a 1-D array.
+        """
+        return self._get(j)
+
+    def __iter__(self):
+        for j in range(0, self.n_cols):
+            yield self.column(j)
+
+    def feature_names(self, feature_names=None):
+        """
+        Return `feature_names` if given, else the column names as strings
+        (or the column indices as strings if the input has no names).
+        """
+        if feature_names is not None:
+            return list(feature_names)
+        if self.names is not None:
+            return [str(name) for name in self.names]
+        return [str(j) for j in range(0, self.n_cols)]
+
+
+def as_columns(X):
+    """
+    Wrap a dataset in a `Columns` view (unless it already is one).
+    """
+    return X if isinstance(X, Columns) else Columns(X)
+
+
+def compress_rows(X, y):
+    """
+    Collapse identical rows of an encoded (integer) dataset and their class
+    labels into unique rows, weighted by the number of times they occur.
+
+    Args:
+        X (:obj:`numpy.array`): An integer-encoded categorical dataset.
+        y (:obj:`numpy.array`): Integer-encoded class labels.
+
+    Returns:
+        tuple: The unique rows of `X`, their labels, and their weights.
+    """
+    y = np.asarray(y).ravel()
+    dtype = np.promote_types(X.dtype, np.min_scalar_type(y.max()))
+    Z = np.empty((X.shape[0], X.shape[1] + 1), dtype=dtype)
+    Z[:, :-1] = X
+    Z[:, -1] = y
+    Z, weights = np.unique(Z, axis=0, return_counts=True)
+    return (Z[:, :-1].astype(X.dtype), Z[:, -1].astype(y.dtype),
+            weights.astype("int64"))
@@ -24,26 +24,56 @@ from __future__ import (
     unicode_literals
 )
 
+import heapq
+import itertools
+from collections import OrderedDict
+
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
+from carmine.data import as_columns, compress_rows
 from carmine.rule import Rule, RuleList
 
 
+# approximate memory cost of a tree node, and of each object in its obidset
+# (CPython, 64-bit), as used by `MECRTree.plan`
+NODE_BYTES = 1024
+MATCH_BYTES = 64
+
+
 class CategoricalDataTransformer(object):
+    """
+    Label-encodes a categorical dataset column by column into a single
+    compact integer matrix, without copying the input.
+
+    Args:
+        X: A 2-D array (or memmap), DataFrame, pyarrow Table or mapping of
+            columns containing a categorical dataset.
+        y (:obj:`numpy.array`): An array containing class labels.
+    """
     def __init__(self, X, y):
-        self.X = X.copy()
-        self.y = y.copy()
-        self.n_objs = self.X.shape[0]
-        self.n_features = self.X.shape[1]
+        self.X = as_columns(X)
+        self.y = y
+        self.n_objs = self.X.n_rows
+        self.n_features = self.X.n_cols
         self.encoders = [LabelEncoder() for i in range(0, self.n_features)]
+        self.class_encoder = LabelEncoder()
 
     def encode(self):
-        X = self.X
-        for i in range(0, self.n_features):
-            X[:, i] = self.encoders[i].fit_transform(self.X[:, i])
+        X = np.zeros((self.n_objs, self.n_features), dtype="uint8")
+        for i, column in enumerate(self.X):
+            codes = self.encoders[i].fit_transform(column)
+            # widen the matrix if this column has too many distinct values
+            dtype = np.promote_types(
+                X.dtype, np.min_scalar_type(len(self.encoders[i].classes_)))
+            if dtype != X.dtype:
+                X = X.astype(dtype)
+            X[:, i] = codes
         return X
 
+    def encode_classes(self):
+        return self.class_encoder.fit_transform(np.asarray(self.y).ravel())
+
     def decode(self, feature_index, feature_values):
         return self.encoders[feature_index].inverse_transform(feature_values)
 
@@ -57,89 +87,217 @@ class Node(object):
         X (:obj:`numpy.array`): An array containing a categorical dataset.
         y (:obj:`numpy.array`): An array containing class labels.
         matches (:obj:`numpy.array`): A set of matching objects (default: None)
+        n_classes (int): The number of classes, if `y` holds class indices
+            (default: None, i.e. inferred from `y`).
+        items (tuple): (attribute, value) pairs of the itemset (default: ()).
+        weights (:obj:`numpy.array`): The number of objects each row of `X`
+            stands for, if duplicate rows have been collapsed (default: None).
+        n_objs (int): The number of objects in the dataset, if known (e.g.
+            from a parent node) (default: None, i.e. computed).
 
     Attributes:
         n_objs (int): The number of objects in the dataset.
         n_feats (int): The number of features in the dataset.
-        matches (:obj:`numpy.array`): A set of matching objects ("obidset").
-        values (:obj:`numpy.array`):
+        n_classes (int): The number of classes in the dataset.
+        counts (:obj:`numpy.array`): Matching objects per class.
+        matches (:obj:`numpy.array`): A set of matching rows ("obidset").
+        items (tuple): The itemset, as sorted (attribute, value) pairs.
+        attrs (int): A bitmask of the attributes used by the itemset.
+        values (:obj:`numpy.array`): The itemset, as a masked array.
         children (:obj:`list`): A list of this node's children (n+1-itemsets).
+        parents (tuple): The itemsets of the two nodes joined to create this
+            node (None for 1-itemsets).
     """
-    def __init__(self, X, y, matches=None):
+    def __init__(self, X, y, matches=None, n_classes=None, items=(),
+                 weights=None, n_objs=None):
         # store references to dataset
         self.X = X
         self.y = y
+        self.weights = weights
 
         # compute number of objects and features in dataset
-        self.n_objs, self.n_feats = X.shape
+        n_rows, self.n_feats = X.shape
+        if n_objs is None:
+            n_objs = n_rows if weights is None else weights.sum()
+        self.n_objs = n_objs
 
-        # compute matching object indices and values
+        # compute matching row indices
         if matches is None:
-            self.matches = set(np.arange(0, self.n_objs, dtype="int32"))
+            self.matches = set(np.arange(0, n_rows, dtype="int32"))
         else:
             self.matches = set(matches)
 
-        # create masked array to hold class values
-        self.values = np.ma.zeros(self.n_feats, dtype="int32")
-        self.values.mask = True
-
-        # compute classes and counts
-        s = pd.value_counts(
-            y[list(self.matches)],
-            sort=False
-        ).sort_index()
-        self.n_classes, self.counts = s.index.size, s.values
+        # store the itemset as sorted (attribute, value) pairs, along with a
+        # bitmask of the attributes it uses
+        self.items = tuple(sorted(items))
+        self.attrs = 0
+        for attr, _ in self.items:
+            self.attrs |= 1 << int(attr)
+
+        # compute class counts (indexed by class, including absent classes)
+        if n_classes is None:
+            n_classes = int(np.max(y)) + 1
+        self.n_classes = n_classes
+        rows = list(self.matches)
+        self.counts = np.bincount(
+            np.asarray(y[rows], dtype="int64"),
+            weights=None if weights is None else weights[rows],
+            minlength=n_classes
+        )
+        self.occurrence = self.counts.sum()
 
         # children for tree node
         self.children = []
-
-    def create_child(self, other):
-        def _make_child(n, n_nn, o, o_nn):
-            # make sure child doesn't just match the same objects as parent
-            matches = n.matches & o.matches
-            matches_parents = (len(matches) == len(self.matches) or
-                               len(matches) == len(other.matches))
-            if len(matches) > 0 and not matches_parents:
-                c = Node(n.X, n.y, matches=matches)
-                c.values.data[n_nn] = np.compress(n_nn, n.values.data)
-                c.values.data[o_nn] = np.compress(o_nn, o.values.data)
-                c.values.mask[(n_nn | o_nn)] = False
-                return c
-
-        self_nn = ~self.values.mask
-        other_nn = ~other.values.mask
-        shared = (self_nn & other_nn)
-
-        # if parents don't share attributes, combine rules
-        no_shared_attrs = ~np.any(shared)
-        if no_shared_attrs:
-            return _make_child(self, self_nn, other, other_nn)
-
-        # if parents share attributes but have the same values, combine
-        attrs_same_vals = np.any(np.compress(shared, self.values) ==
-                                 np.compress(shared, other.values))
-        if attrs_same_vals:
-            return _make_child(self, self_nn, other, other_nn)
+        self.parents = None
+
+    def create_child(self, other, keep_equal=False):
+        # nodes over the same attributes with different values can't match
+        # any common objects (Theorem 1 in the MECR paper)
+        if self.attrs == other.attrs and self.items != other.items:
+            return None
+
+        # if parents share attributes, they must have the same values
+        items = set(self.items) | set(other.items)
+        if len(items) != bin(self.attrs | other.attrs).count("1"):
+            return None
+
+        # make sure child doesn't just match the same objects as parent
+        # (unless asked to keep such children, e.g. when mining a sample)
+        matches = self.matches & other.matches
+        matches_parents = (len(matches) == len(self.matches) or
+                           len(matches) == len(other.matches))
+        if len(matches) > 0 and (keep_equal or not matches_parents):
+            child = Node(self.X, self.y, matches=matches,
+                         n_classes=self.n_classes, items=items,
+                         weights=self.weights, n_objs=self.n_objs)
+            child.parents = (self.items, other.items)
+            return child
 
         return None
 
+    @property
+    def values(self):
+        """
+        The itemset as a masked array of attribute values.
+        """
+        values = np.ma.zeros(self.n_feats, dtype="int32")
+        values.mask = True
+        for attr, value in self.items:
+            values[attr] = value
+        return values
+
     @property
     def classification(self):
         return np.argmax(self.counts)
 
+    @property
+    def pure(self):
+        return np.max(self.counts) == self.actual_occurrence
+
     @property
     def confidence(self):
         return np.max(self.counts) / self.actual_occurrence
 
     @property
     def actual_occurrence(self):
-        return len(self.matches)
+        return self.occurrence
 
     @property
     def support(self):
         return np.max(self.counts) / self.n_objs
 
 
+class NodeSummaryCache(object):
+    """
+    Bounded cache of mined tree nodes, summarised as their antecedents and
+    class counts, so that mining can be repeated at a higher minimum support
+    (and any minimum confidence) by filtering, without touching the data.
+
+    Every node that meets a minimum support threshold is generated by the
+    same joins at any lower threshold, so a summary mined at `min_support`
+    answers every query at or above it. Entries are keyed by the pruning
+    mode and target class (None when mining for all classes; such entries
+    also answer queries for any single class), and a new entry replaces any
+    entry it covers. The least recently
+    used entries are evicted once more than `max_nodes` summaries are held.
+
+    Args:
+        max_nodes (int): Maximum number of node summaries held in the cache.
+    """
+    def __init__(self, max_nodes=1000000):
+        self.max_nodes = max_nodes
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return sum(e["occurrence"].size for e in self.entries.values())
+
+    def get(self, min_support, prune, target_class=None):
+        """
+        Return the smallest summary covering `min_support`, or None.
+        """
+        best = None
+        for key in self.entries:
+            entry_prune, entry_target, entry_support = key
+            if (entry_prune == prune and entry_support <= min_support and
+                    entry_target in (None, target_class)):
+                if best is None or entry_support > best[2]:
+                    best = key
+        if best is None:
+            return None
+        # mark as most recently used
+        self.entries[best] = self.entries.pop(best)
+        return self.entries[best]
+
+    def put(self, min_support, prune, summary, target_class=None):
+        """
+        Cache a summary of the nodes mined at `min_support`.
+        """
+        if summary["occurrence"].size > self.max_nodes:
+            return
+
+        # drop entries made redundant by the new one
+        for key in list(self.entries):
+            if (key[0] == prune and key[2] >= min_support and
+                    target_class in (None, key[1])):
+                del self.entries[key]
+
+        self.entries[(prune, target_class, min_support)] = summary
+        while len(self) > self.max_nodes:
+            self.entries.popitem(last=False)
+
+
+def _sample_counts(rng, weights, size):
+    """
+    Draw how many of `size` objects, sampled uniformly without replacement,
+    come from each row, where row i stands for `weights[i]` (> 0) objects.
+
+    Rows are never expanded into objects: they are split into halves
+    recursively, drawing hypergeometrically how many of each segment's
+    sampled objects fall into its first half, one vectorised draw per level.
+    """
+    weights = np.asarray(weights, dtype="int64")
+    cum = np.concatenate([[0], np.cumsum(weights)])
+    counts = np.zeros(weights.size, dtype="int64")
+
+    starts = np.zeros(1, dtype="int64")
+    ends = np.full(1, weights.size, dtype="int64")
+    sizes = np.full(1, min(size, cum[-1]), dtype="int64")
+    while starts.size > 0:
+        # segments of a single row are settled, and empty ones are dropped
+        single = ends - starts == 1
+        counts[starts[single]] = sizes[single]
+        keep = ~single & (sizes > 0)
+        starts, ends, sizes = starts[keep], ends[keep], sizes[keep]
+
+        mids = (starts + ends) // 2
+        left = rng.hypergeometric(cum[mids] - cum[starts],
+                                  cum[ends] - cum[mids], sizes)
+        starts = np.concatenate([starts, mids])
+        ends = np.concatenate([mids, ends])
+        sizes = np.concatenate([left, sizes - left])
+    return counts
+
+
 class MECRTree(object):
     """
     Implementation of the MECR tree class association rule mining algorithm
@@ -147,13 +305,23 @@ class MECRTree(object):
 
     [1]: http://dx.doi.org/10.1016/j.eswa.2012.10.035
     """
-    def __init__(self, X, y, feature_names=None, class_names=None):
+    def __init__(self, X, y, feature_names=None, class_names=None,
+                 cache_size=100000, compress=False):
         self.transformer = CategoricalDataTransformer(X, y)
         self.X = self.transformer.encode()
-        self.y = y
+        self.y = self.transformer.encode_classes()
+        self.n_classes = self.transformer.class_encoder.classes_.size
+
+        # optionally collapse duplicate rows, counting each one by weight
+        self.weights = None
+        if compress:
+            self.X, self.y, self.weights = compress_rows(self.X, self.y)
+        self.n_objs = self.transformer.n_objs
 
         if feature_names is not None:
             self.feature_names = feature_names
+        elif self.transformer.X.names is not None:
+            self.feature_names = self.transformer.X.names
         else:
             n_features = self.X.shape[1]
             self.feature_names = np.arange(0, n_features)
@@ -161,27 +329,28 @@ class MECRTree(object):
         if class_names is not None:
             self.class_names = class_names
         else:
-            n_classes = np.unique(y).size
-            self.class_names = np.arange(0, n_classes)
+            self.class_names = self.transformer.class_encoder.classes_
 
         self.rules = None
+        self.approximation = None
+        self.cache = NodeSummaryCache(cache_size) if cache_size else None
 
-    def _construct_root_node(self, X, y, min_support):
+    def _construct_root_node(self, X, y, min_support, weights=None):
         """
         Generate a root node with all 1-itemsets, extracted from data.
         """
-        n = Node(X, y)
+        n = Node(X, y, weights=weights)
         n_feats = X.shape[1]
         for feat in np.arange(0, n_feats):
             values = pd.unique(X[:, feat])
             for value in values:
                 matches = np.nonzero(X[:, feat] == value)[0]
-                c = Node(X, y, matches=matches)
-                c.values[feat] = value
+                c = Node(X, y, matches=matches, n_classes=n.n_classes,
+                         items=[(feat, value)], weights=weights,
+                         n_objs=n.n_objs)
                 if c.support >= min_support:
                     n.children.append(c)
 
-        print(n.children)
         return n
 
     def _create_rule(self, values, classification, confidence, support):
@@ -192,45 +361,308 @@ class MECRTree(object):
                 clause = (
                     str(self.feature_names[i]),
                     Rule.EQ,
-                    self.transformer.decode(i, values[i])
+                    self.transformer.decode(i, [values[i]])[0]
                 )
                 rule.add(clause)
         rule.classification = self.class_names[classification]
         rule.purity = confidence
         rule.proportion = support
-        rule.matches = confidence * support * self.X.shape[0]
+        rule.matches = confidence * support * self.n_objs
         rule.score = (rule.purity, rule.proportion)
 
         return rule
 
-    def _mine(self, root, min_support, min_confidence):
-        rules = RuleList()
+    def _mine_nodes(self, root, min_support, min_confidence, prune=False,
+                    bound=None, keep_equal=False):
+        """
+        Walk the tree below `root`, yielding every node that meets the
+        minimum confidence criterion (support is enforced during expansion).
+
+        With `prune` set, nodes with 100% confidence are not joined with any
+        other node: every node derived from them would also have 100%
+        confidence for the same class (and lower support), so it would only
+        yield a redundant specialisation of a rule that is already emitted.
+
+        `bound` is an optional anti-monotone predicate evaluated lazily on
+        each node; nodes for which it returns False are neither extended,
+        joined nor kept as children, which allows callers to tighten the
+        search while consuming results.
+
+        With `keep_equal` set, children matching the same objects as one of
+        their parents are kept (see `Node.create_child`).
+        """
         queue = [root]
         while len(queue) > 0:
             node = queue.pop()
-            for i, l_i in enumerate(node.children):
+            # siblings over the same attributes can't be joined (and are
+            # generated next to each other), so skip past each such run
+            siblings = node.children
+            ends = [len(siblings)] * len(siblings)
+            for i in range(len(siblings) - 2, -1, -1):
+                if siblings[i].attrs == siblings[i + 1].attrs:
+                    ends[i] = ends[i + 1]
+                else:
+                    ends[i] = i + 1
+
+            for i, l_i in enumerate(siblings):
                 # enumerate rules
                 if (len(l_i.children) == 0 and
                         (l_i.confidence >= min_confidence)):
-
-                    rules.add(
-                        self._create_rule(
-                            l_i.values,
-                            l_i.classification,
-                            l_i.confidence,
-                            l_i.support
-                        )
-                    )
-
-                for l_j in node.children[i+1:]:
-                    child = l_i.create_child(l_j)
-                    if child is not None and child.support >= min_support:
+                    yield l_i
+
+                if prune and l_i.pure:
+                    continue
+                if bound is not None and not bound(l_i):
+                    continue
+
+                for l_j in siblings[ends[i]:]:
+                    if prune and l_j.pure:
+                        continue
+                    if bound is not None and not bound(l_j):
+                        continue
+                    child = l_i.create_child(l_j, keep_equal)
+                    if child is None or child.support < min_support:
+                        continue
+                    if bound is None or bound(child):
                         l_i.children.append(child)
 
                 queue.append(l_i)
+
+    def _summarise(self, nodes):
+        """
+        Summarise mined nodes as arrays of antecedent values (-1 where an
+        attribute is unused), class counts and actual occurrences.
+        """
+        n_nodes, n_feats = len(nodes), self.X.shape[1]
+        values = np.full((n_nodes, n_feats), -1, dtype="int32")
+        counts = np.zeros((n_nodes, self.n_classes), dtype="int64")
+        occurrence = np.zeros(n_nodes, dtype="int64")
+        for i, node in enumerate(nodes):
+            for attr, value in node.items:
+                values[i, attr] = value
+            counts[i] = node.counts
+            occurrence[i] = node.actual_occurrence
+        return {"values": values, "counts": counts, "occurrence": occurrence}
+
+    def _filter_summary(self, summary, min_support, min_confidence,
+                        target=None):
+        """
+        Create rules for the summarised nodes meeting both thresholds, either
+        for their majority class or for the `target` class index.
+        """
+        if target is None:
+            classification = summary["counts"].argmax(axis=1)
+        else:
+            classification = np.full(summary["occurrence"].size, target)
+        best = summary["counts"][np.arange(classification.size),
+                                 classification]
+        support = best / self.n_objs
+        confidence = best / summary["occurrence"]
+
+        rules = RuleList()
+        keep = (support >= min_support) & (confidence >= min_confidence)
+        for i in np.flatnonzero(keep):
+            values = summary["values"][i]
+            rules.add(
+                self._create_rule(
+                    np.ma.array(values, mask=(values < 0)),
+                    classification[i],
+                    confidence[i],
+                    support[i]
+                )
+            )
+        return rules
+
+    def _stratified_sample(self, sample_size, random_state=None):
+        """
+        Return a list of nested, class-stratified object samples of
+        increasing size (doubling up to `sample_size`) for progressive
+        sampling, each as an array of rows and their weights in the sample
+        (None if duplicate rows haven't been collapsed).
+        """
+        rng = np.random.RandomState(random_state)
+        n_objs = self.n_objs
+        sample_size = min(sample_size, n_objs)
+
+        sizes = [sample_size]
+        while sizes[-1] > 1000:
+            sizes.append(sizes[-1] // 2)
+
+        def stratum_size(size, n):
+            return max(1, int(round(size * n / n_objs)))
+
+        if self.weights is None:
+            # shuffle each class independently so every prefix is stratified
+            strata = [rng.permutation(np.nonzero(self.y == cls)[0])
+                      for cls in np.unique(self.y)]
+            return [
+                (np.sort(np.concatenate([s[:stratum_size(size, s.size)]
+                                         for s in strata])), None)
+                for size in reversed(sizes)
+            ]
+
+        # draw how many objects of each collapsed row are sampled, from the
+        # largest sample down, each a uniform subsample of the one before
+        samples = []
+        for cls in np.unique(self.y):
+            rows = np.nonzero(self.y == cls)[0]
+            counts = self.weights[rows]
+            n = counts.sum()
+            for i, size in enumerate(sizes):
+                counts = _sample_counts(rng, counts, stratum_size(size, n))
+                drawn = np.nonzero(counts)[0]
+                rows, counts = rows[drawn], counts[drawn]
+                if len(samples) <= i:
+                    samples.append(([], []))
+                samples[i][0].append(rows)
+                samples[i][1].append(counts)
+
+        result = []
+        for rows, counts in reversed(samples):
+            rows, counts = np.concatenate(rows), np.concatenate(counts)
+            order = np.argsort(rows)
+            result.append((rows[order], counts[order]))
+        return result
+
+    def _verify(self, nodes, chunk_size=2 ** 22):
+        """
+        Compute exact class counts over the full dataset for a list of
+        candidate nodes (mined on a sample) in a single vectorised pass.
+
+        Returns:
+            (:obj:`numpy.array`, :obj:`numpy.array`): Per-candidate class
+                counts (n_candidates x n_classes) and antecedent counts.
+        """
+        X, y, weights = self.X, self.y, self.weights
+        classes = np.unique(y)
+
+        # index every distinct (feature, value) item used by a candidate
+        items = {}
+        incidence = []
+        for node in nodes:
+            cols = [items.setdefault(item, len(items)) for item in node.items]
+            incidence.append(cols)
+
+        C = np.zeros((len(items), len(nodes)), dtype="int32")
+        for j, cols in enumerate(incidence):
+            C[cols, j] = 1
+        lengths = C.sum(axis=0)
+
+        counts = np.zeros((len(nodes), classes.size), dtype="int64")
+        rows = max(1, chunk_size // max(1, len(nodes)))
+        for start in range(0, X.shape[0], rows):
+            Xc, yc = X[start:start + rows], y[start:start + rows]
+            B = np.zeros((Xc.shape[0], len(items)), dtype="int32")
+            for (f, v), col in items.items():
+                B[:, col] = Xc[:, f] == v
+            matched = (B.dot(C) == lengths).astype("int64")
+            Y = (yc[:, None] == classes[None, :]).astype("int64")
+            if weights is not None:
+                Y *= weights[start:start + rows, None]
+            counts += Y.T.dot(matched).T
+
+        return counts, counts.sum(axis=1)
+
+    def _train_approximate(self, min_support, min_confidence, sample_size,
+                           delta, random_state, prune):
+        """
+        Mine candidates on a progressive stratified sample with the support
+        threshold lowered by a Hoeffding margin, then verify them on the full
+        data.
+
+        The sample is always mined without pruning, since a node that is pure
+        in the sample needn't be pure in the full data; with `prune` set,
+        rules that specialise a verified 100% confidence rule for the same
+        class are dropped after verification instead. Likewise, children
+        that match the same sampled objects as a parent are kept, and every
+        node is verified: a node is only a rule if the exact tree would have
+        it, i.e. its support clears `min_support`, it matches fewer objects
+        than either of its parents, and both of its parents are in the tree.
+        """
+        n_objs = self.n_objs
+        candidates = None
+        samples = self._stratified_sample(sample_size, random_state)
+        for sample, weights in samples:
+            # one-sided Hoeffding bound on support (confidence needs no
+            # margin, since it is only checked once nodes are verified)
+            m = sample.size if weights is None else weights.sum()
+            eps_s = np.sqrt(np.log(1 / delta) / (2 * m))
+            lo_support = max(0.0, min_support - eps_s)
+
+            root = self._construct_root_node(
+                self.X[sample], self.y[sample], lo_support, weights)
+            # every node is kept, so that its children can be verified
+            nodes = {}
+            for node in self._mine_nodes(root, lo_support, 0.0,
+                                         keep_equal=True):
+                nodes.setdefault(node.items, node)
+
+            # stop growing the sample once the candidate set is stable
+            converged = candidates is not None and \
+                set(nodes) == set(candidates)
+            candidates = nodes
+            if converged:
+                break
+
+        nodes = list(candidates.values())
+        stats = {}
+        if len(nodes) > 0:
+            counts, occurrence = self._verify(nodes)
+            for node, c, occ in zip(nodes, counts, occurrence):
+                stats[node.items] = (c, occ)
+
+        in_tree = {}
+
+        def exact(items):
+            # whether exact mining on the full data would generate the node
+            if items not in in_tree:
+                c, occ = stats[items]
+                parents = candidates[items].parents or ()
+                in_tree[items] = (
+                    occ > 0 and c.max() / n_objs >= min_support and
+                    all(p in stats and stats[p][1] > occ and exact(p)
+                        for p in parents)
+                )
+            return in_tree[items]
+
+        verified = []
+        for node in nodes:
+            c, occ = stats[node.items]
+            if not exact(node.items):
+                continue
+            confidence = c.max() / occ
+            if confidence >= min_confidence:
+                verified.append((node, np.argmax(c), confidence,
+                                 c.max() / n_objs))
+
+        pure = set()
+        if prune:
+            pure = set((node.items, cls)
+                       for node, cls, confidence, _ in verified
+                       if confidence == 1.0)
+
+        rules = RuleList()
+        for node, cls, confidence, support in verified:
+            general = (
+                (items, cls) in pure
+                for size in range(1, len(node.items))
+                for items in itertools.combinations(node.items, size)
+            )
+            if not any(general):
+                rules.add(self._create_rule(
+                    node.values, cls, confidence, support))
+
+        self.approximation = {
+            "sample_size": m,
+            "n_candidates": len(nodes),
+            "support_margin": eps_s,
+            "delta": delta,
+            "per_rule_confidence": 1 - delta,
+        }
         return rules
 
-    def train(self, min_support, min_confidence):
+    def train(self, min_support, min_confidence, sample_size=None,
+              delta=0.05, random_state=None, prune=False, target_class=None):
         """
         Train the MECR tree by mining and filtering rules according to minimum
         support and confidence criteria.
@@ -239,11 +671,312 @@ class MECRTree(object):
         mathematical definitions of support and confidence, etc), refer to
         [this post on Medium][1].
 
+        If `sample_size` is given, rules are mined approximately: candidates
+        are mined on a progressively growing, class-stratified random sample
+        (of at most `sample_size` rows) with the support threshold lowered
+        by a Hoeffding margin, and then verified against the full dataset.
+        The sample is mined without pruning any nodes but those below the
+        lowered support, so a true rule is only missed if its own support in
+        the sample falls short (its ancestors' is never lower). Every returned
+        rule has exact statistics and meets both thresholds; each true rule
+        is missed with probability at most `delta`. This is a per-rule bound:
+        the chance of missing *some* true rule grows with the number of
+        rules. The details are stored in `self.approximation`.
+
+        If `target_class` is given, only rules predicting that class are
+        mined, with support and confidence measured for that class (even
+        where it isn't the majority class). Since a node's count for a class
+        can only shrink as it is extended, branches where that count is
+        below `min_support` are pruned.
+
         [1]: https://goo.gl/n3VzB7
 
         Arguments:
             min_support (float): Minimum support for rules.
             min_confidence (float): Minimum confidence for rules.
+            sample_size (int): Maximum sample size for approximate mining
+                (default: None, i.e. exact mining on all rows).
+            delta (float): Per-rule probability of missing a true rule when
+                mining approximately (default: 0.05).
+            random_state (int): Seed for the sampler (default: None).
+            prune (bool): Skip extending nodes with 100% confidence. This
+                omits the more specific rules for the same class (which are
+                no more accurate), so fewer rules are returned than without
+                pruning (default: False).
+            target_class: Class label (as in `y`) to mine rules for
+                (default: None, i.e. all classes).
+        """
+        if sample_size is not None and target_class is not None:
+            raise ValueError(
+                "target_class isn't supported for approximate mining")
+
+        if sample_size is not None:
+            self.root = None
+            self.rules = self._train_approximate(
+                min_support, min_confidence, sample_size, delta, random_state,
+                prune)
+            return
+
+        self.approximation = None
+        target = self._class_index(target_class)
+        summary = None
+        if self.cache is not None:
+            summary = self.cache.get(min_support, prune, target)
+
+        if summary is None:
+            bound = None
+            if target is not None:
+                min_count = min_support * self.n_objs
+
+                def bound(node):
+                    return node.counts[target] >= min_count
+
+            self.root = self._construct_root_node(
+                self.X, self.y, min_support, self.weights)
+            nodes = self._mine_nodes(self.root, min_support, 0.0, prune,
+                                     bound)
+            summary = self._summarise(list(nodes))
+            if self.cache is not None:
+                self.cache.put(min_support, prune, summary, target)
+        else:
+            self.root = None
+
+        self.rules = self._filter_summary(
+            summary, min_support, min_confidence, target)
+
+    def _class_index(self, target_class):
+        if target_class is None:
+            return None
+        encoder = self.transformer.class_encoder
+        return int(encoder.transform([target_class])[0])
+
+    def query(self, min_support, min_confidence, prune=False,
+              target_class=None):
+        """
+        Return the rules meeting the given thresholds from a previous call
+        to `train` at the same or a lower minimum support, without mining.
+
+        Arguments:
+            min_support (float): Minimum support for rules.
+            min_confidence (float): Minimum confidence for rules.
+            prune (bool): Pruning mode of the cached mining run
+                (default: False).
+            target_class: Class label to return rules for (default: None,
+                i.e. all classes).
+
+        Returns:
+            (:obj:`carmine.rule.RuleList`): The matching rules.
+        """
+        target = self._class_index(target_class)
+        summary = None
+        if self.cache is not None:
+            summary = self.cache.get(min_support, prune, target)
+        if summary is None:
+            raise KeyError(
+                "No cached mining run covers min_support={}".format(
+                    min_support))
+        return self._filter_summary(
+            summary, min_support, min_confidence, target)
+
+    def _item_class_counts(self):
+        """
+        Count the objects of each class matching each (feature, value) item,
+        in one pass over the encoded data.
+        """
+        item_counts = []
+        for j in range(0, self.X.shape[1]):
+            n_values = self.transformer.encoders[j].classes_.size
+            codes = self.X[:, j].astype("int64") * self.n_classes + self.y
+            counts = np.bincount(codes, weights=self.weights,
+                                 minlength=n_values * self.n_classes)
+            item_counts.append(counts.reshape(n_values, self.n_classes))
+        return item_counts
+
+    def _estimate_levels(self, item_counts, min_support, max_depth,
+                         bins=256):
+        """
+        Estimate the number of nodes (and the total size of their obidsets)
+        at each depth of the tree, assuming that attributes are independent
+        within each class.
+
+        For every class, itemsets are counted by dynamic programming over the
+        attributes on a histogram of their (negative log) class-conditional
+        probability, discarding any itemset whose support for the class falls
+        below `min_support`. Costs are rounded down and itemsets frequent for
+        several classes are counted once per class, which inflates the
+        estimates, while correlated attributes can make them too low.
+        """
+        n_objs = self.n_objs
+        min_count = max(min_support * n_objs, 1.0)
+        candidates = np.zeros(max_depth + 1)
+        matches = np.zeros(max_depth + 1)
+
+        class_counts = np.bincount(self.y, weights=self.weights,
+                                   minlength=self.n_classes)
+        for c, n_class in enumerate(class_counts):
+            if n_class < min_count:
+                continue
+            limit = np.log(n_class / min_count)
+            width = limit / bins if limit > 0 else 1.0
+
+            # dp[k, b]: itemsets of k items with cost in bin b; mass holds
+            # the sum of their class-conditional probabilities
+            dp = np.zeros((max_depth + 1, bins + 1))
+            mass = np.zeros((max_depth + 1, bins + 1))
+            dp[0, 0] = mass[0, 0] = 1.0
+            for counts in item_counts:
+                new_dp, new_mass = dp.copy(), mass.copy()
+                for p in counts[:, c] / n_class:
+                    if p == 0 or -np.log(p) > limit + 1e-9:
+                        continue
+                    shift = min(int(-np.log(p) // width), bins)
+                    new_dp[1:, shift:] += dp[:-1, :bins + 1 - shift]
+                    new_mass[1:, shift:] += mass[:-1, :bins + 1 - shift] * p
+                dp, mass = new_dp, new_mass
+
+            candidates += dp.sum(axis=1)
+            matches += mass.sum(axis=1) * n_class
+
+        return candidates[1:], matches[1:]
+
+    def plan(self, min_support, max_depth=None, memory_budget=None,
+             max_candidates=None):
+        """
+        Estimate the size of a mining run before running it.
+
+        The support of every 1-itemset is computed in one pass over the data,
+        and used to estimate the number of candidate nodes and their memory
+        footprint at each depth of the tree (see `_estimate_levels`). Pruning
+        of 100% confidence nodes is not taken into account.
+
+        If a memory budget (in bytes) or a maximum number of candidates (a
+        proxy for running time) is given, the smallest minimum support whose
+        estimates fit within them is also suggested.
+
+        Arguments:
+            min_support (float): Minimum support for rules.
+            max_depth (int): Maximum number of conditions per rule
+                (default: None, i.e. the number of features).
+            memory_budget (int): Memory available for the tree, in bytes
+                (default: None).
+            max_candidates (int): Maximum number of tree nodes
+                (default: None).
+
+        Returns:
+            dict: "item_supports" (support of every 1-itemset), "levels"
+                (estimated "candidates" and "memory" at each "depth"),
+                total "candidates" and "memory", and "suggested_min_support"
+                (None unless a budget is given and can be met).
+        """
+        n_objs, n_feats = self.n_objs, self.X.shape[1]
+        if max_depth is None or max_depth > n_feats:
+            max_depth = n_feats
+
+        item_counts = self._item_class_counts()
+
+        def estimate(support):
+            candidates, matches = self._estimate_levels(
+                item_counts, support, max_depth)
+            memory = candidates * NODE_BYTES + matches * MATCH_BYTES
+            return candidates, memory
+
+        def fits(support):
+            candidates, memory = estimate(support)
+            return ((memory_budget is None or
+                     memory.sum() <= memory_budget) and
+                    (max_candidates is None or
+                     candidates.sum() <= max_candidates))
+
+        candidates, memory = estimate(min_support)
+        levels = [
+            {"depth": d + 1, "candidates": candidates[d], "memory": memory[d]}
+            for d in range(0, max_depth)
+        ]
+
+        # estimates shrink as support grows, so bisect for the budget
+        suggested = None
+        if memory_budget is not None or max_candidates is not None:
+            if fits(min_support):
+                suggested = min_support
+            elif fits(1.0):
+                lo, hi = min_support, 1.0
+                while hi - lo > 1.0 / n_objs:
+                    mid = (lo + hi) / 2
+                    lo, hi = (lo, mid) if fits(mid) else (mid, hi)
+                suggested = hi
+
+        return {
+            "item_supports": np.concatenate(
+                [c.max(axis=1) for c in item_counts]) / n_objs,
+            "levels": levels,
+            "candidates": candidates.sum(),
+            "memory": memory.sum(),
+            "suggested_min_support": suggested,
+        }
+
+    def train_top_k(self, k, metric="confidence", min_support=0.0,
+                    min_confidence=0.0, prune=False):
         """
-        self.root = self._construct_root_node(self.X, self.y, min_support)
-        self.rules = self._mine(self.root, min_support, min_confidence)
+        Mine the `k` best rules by a given metric, without having to choose
+        support and confidence thresholds up front.
+
+        The best rules found so far are kept in a bounded heap. Once it holds
+        `k` rules, the worst of them sets a cutoff that is used to prune the
+        rest of the search: support is anti-monotone, so branches whose
+        support is below the cutoff can't produce a rule that enters the
+        heap. When ranking by confidence, this applies once the heap is full
+        of 100% confidence rules (ties are broken on support).
+
+        Arguments:
+            k (int): Number of rules to return.
+            metric (str): Either "confidence" (ties broken on support) or
+                "support" (ties broken on confidence).
+            min_support (float): Minimum support for rules (default: 0.0).
+            min_confidence (float): Minimum confidence for rules
+                (default: 0.0).
+            prune (bool): Skip extending nodes with 100% confidence
+                (default: False).
+        """
+        if metric == "confidence":
+            def key(node):
+                return (node.confidence, node.support)
+        elif metric == "support":
+            def key(node):
+                return (node.support, node.confidence)
+        else:
+            raise ValueError("Unknown metric \"{}\"".format(metric))
+
+        heap = []
+        counter = itertools.count()
+
+        def bound(node):
+            if len(heap) < k:
+                return True
+            worst = heap[0][0]
+            if metric == "support":
+                return node.support >= worst[0]
+            # only rules with 100% confidence can beat a heap full of them
+            return worst[0] < 1.0 or node.support >= worst[1]
+
+        self.approximation = None
+        self.root = self._construct_root_node(
+            self.X, self.y, min_support, self.weights)
+        nodes = self._mine_nodes(self.root, min_support, min_confidence,
+                                 prune, bound)
+        for node in nodes:
+            entry = (key(node), next(counter), node)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry[0] > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+
+        self.rules = RuleList()
+        for _, _, node in heap:
+            self.rules.add(
+                self._create_rule(
+                    node.values,
+                    node.classification,
+                    node.confidence,
+                    node.support
+                )
+            )
@@ -17,37 +17,86 @@ import numpy as np
 import pandas as pd
 import sympy  #TODO: can get rid of this dependency by locally storing list of primes
 
+from carmine.data import as_columns, compress_rows
+
+# approximate memory cost of a candidate rule (its id pair and rule_df row),
+# plus one float column per class-specific result, as used by `PrimeMBA.plan`
+CANDIDATE_BYTES = 400
+CANDIDATE_CLASS_BYTES = 24
+
 
 class PrimeMBA(object):
     """
     This is a novel implementation of MBA using prime numbers
-    """
-    def __init__(self, X, y, feature_names=None):
-
-        Z = np.hstack((X, y[:, None]))
 
-        if feature_names is None:
-            n_features = X.shape[1]
-            feature_names = np.arange(0, n_features)\
-                    .astype(str).tolist()
-        feature_names.append("y")
+    The target may be any categorical variable. Joint counts with every class
+    are computed for all candidate rules in one pass over the rows, and are
+    reported as "support (X, y=c)", "confidence (X -> y=c)" and
+    "lift (X -> y=c)" columns. Binary 0/1 targets are treated as booleans,
+    and the columns for the `event` class (True for binary targets) are also
+    reported as "support (X, Event)" and "confidence (X -> Event)".
 
-
-        data = pd.DataFrame(data=Z, columns=feature_names)
-        data["y"] = data["y"].astype(bool)
-        self.data = data
-        self.primed_data = data
+    With `compress`, identical rows are collapsed into one weighted row
+    before their products are computed, which gives the same results in
+    less time and memory when the data has many duplicate rows.
+    """
+    def __init__(self, X, y, feature_names=None, event=None, compress=False):
+
+        self.columns = as_columns(X)
+        self.feature_names = self.columns.feature_names(feature_names)
+
+        y = np.asarray(y).ravel()
+        if set(pd.unique(y)).issubset({0, 1}):
+            y = y.astype(bool)
+            if event is None:
+                event = True
+
+        self.y = y
+        self.event = event
+        self.compress = compress
+        self.weights = None
+        self.n_objs = self.columns.n_rows
+        self.column_primes = None
         self.rule_df = None
+        self._encoded = None
 
-    def _primes_and_unique_list(self):
-        df = self.data.copy()
-        df = df.astype(str)
-        for column in df:
-            df[column]= column + '=' + df[column]
+    def _encode(self):
+        """
+        Encode each column (including "y") separately as the sorted string
+        representations of its values and a compact array of codes, so that
+        only one column is ever expanded to strings at a time.
 
-        F = df.as_matrix()
-        F_unique = np.unique(F)
+        With `compress`, the codes are then collapsed into unique rows and
+        `weights` (the number of objects each row stands for).
+        """
+        if self._encoded is None:
+            self._encoded = []
+            columns = list(self.columns) + [self.y]
+            for name, column in zip(self.feature_names + ["y"], columns):
+                uniques, codes = np.unique(np.asarray(column).astype(str),
+                                           return_inverse=True)
+                codes = codes.reshape(-1).astype(
+                    np.min_scalar_type(max(0, uniques.size - 1)))
+                self._encoded.append((name, uniques, codes))
+
+            if self.compress:
+                codes = [c for _, _, c in self._encoded]
+                X = np.column_stack(codes[:-1]).astype(
+                    np.result_type(*codes[:-1]))
+                X, y, self.weights = compress_rows(X, codes[-1])
+                self._encoded = [
+                    (name, uniques, column)
+                    for (name, uniques, _), column in
+                    zip(self._encoded, list(X.T) + [y])
+                ]
+        return self._encoded
 
+    def _primes_and_unique_list(self):
+        # unique items, grouped by column in the order primes are assigned
+        F_unique = np.concatenate([
+            np.array(["{}={}".format(name, u) for u in uniques])
+            for name, uniques, _ in self._encode()
+        ])
 
         n = F_unique.size
         nth = sympy.prime(n)
@@ -56,57 +105,87 @@ class PrimeMBA(object):
 
         return prime_list, F_unique
 
-    def _replace_with_prime(self, df):
+    def _calc_prod(self, prime_list, F_unique):
         """
-        This function does the same as
-        df.replace(to_replace=prime_list, value=F_unique)
-        however, it is much faster because it works one column at a time.
+        Multiply together the primes of each row's items, one column at a
+        time.
         """
-        new_df = df.copy()
-        n_start=1
-        for col in df:
-            uniq= df[col].unique()
-            n_end = n_start + len(uniq)
-            start_prime = sympy.prime(n_start)
-            n_start = n_end
-            end_prime = sympy.prime(n_end)
-            col_prime_list = [x for x in sympy.primerange(start_prime-1,end_prime)]
-            primedict={}
-            for i in range(len(col_prime_list)):
-                primedict[uniq[i]]=col_prime_list[i]
-            new_df[col] = df.loc[:,col].map(lambda x : primedict.get(x))
-        return new_df
-
-
-    def _calc_prod(self, prime_list, F_unique):
-        df = self.data.copy()
-        df = df.astype(str)
-        for column in df:
-            df[column]= column + '=' + df[column]
-
-        # TODO: Why is this the replacing so slow!!!
-        df = self._replace_with_prime(df)
-        #TODO: is it ok to define a self. something here?
-        self.primed_data = df
-
-        return df.prod(axis=1)
-
-    def _MBA_calc(self, dataframe, prod, id_event):
+        encoded = self._encode()
+        prod = np.ones(encoded[-1][2].size, dtype="int64")
+        self.column_primes = []
+        start = 0
+        for _, uniques, codes in encoded:
+            primes = np.array(prime_list[start:start + uniques.size],
+                              dtype="int64")
+            prod *= primes[codes]
+            self.column_primes.append(primes)
+            start += uniques.size
+
+        return pd.Series(prod)
+
+    def _count_matches(self, ids, prod, targets, chunk_size=2 ** 22):
+        """
+        Count, in a single pass over the rows, the rows matching each
+        candidate id and the rows matching each candidate id jointly with
+        each target id (a candidates x targets matrix). Rows are counted by
+        `weights` when duplicates have been collapsed.
+        """
+        ids = np.asarray(ids, dtype="int64")
+        prod = np.asarray(prod, dtype="int64")
+        targets = np.asarray(targets, dtype="int64")
+        weights = self.weights
+
+        matches = np.zeros(ids.size, dtype="int64")
+        joint = np.zeros((ids.size, targets.size), dtype="int64")
+        rows = max(1, chunk_size // max(1, ids.size))
+        for start in range(0, prod.size, rows):
+            p = prod[start:start + rows, None]
+            D = (np.mod(p, ids[None, :]) == 0).astype("int64")
+            T = (np.mod(p, targets[None, :]) == 0).astype("int64")
+            if weights is not None:
+                w = weights[start:start + rows]
+                T *= w[:, None]
+                matches += w.dot(D)
+            else:
+                matches += D.sum(axis=0)
+            joint += D.T.dot(T)
+        return matches, joint
+
+    def _MBA_calc(self, dataframe, prod, id_event=None, class_ids=None):
         df = dataframe.copy()
-        df["support"] = df["id"].apply(lambda x: np.mean(np.mod(prod, x) == 0))
-        df["matches"] = (df["support"]*len(prod)).astype(int)
-        df["support (X, Event)"] = df["id"].apply(lambda x: np.mean(np.mod(prod, x*id_event) == 0))
-        df["confidence (X -> Event)"] = df["support (X, Event)"] / df["support"]
+        n = self.n_objs
+        labels = list(class_ids.keys()) if class_ids else []
+        targets = [class_ids[label] for label in labels]
+        if id_event is not None:
+            targets.append(id_event)
+
+        matches, joint = self._count_matches(df["id"].values, prod, targets)
+        df["support"] = matches / n
+        df["matches"] = matches
+        for j, label in enumerate(labels):
+            prior = np.average(np.mod(prod, class_ids[label]) == 0,
+                               weights=self.weights)
+            support = joint[:, j] / n
+            df["support (X, {})".format(label)] = support
+            df["confidence (X -> {})".format(label)] = support / df["support"]
+            df["lift (X -> {})".format(label)] = (support / df["support"] /
+                                                  prior)
+        if id_event is not None:
+            df["support (X, Event)"] = joint[:, -1] / n
+            df["confidence (X -> Event)"] = (df["support (X, Event)"] /
+                                             df["support"])
         return df
 
     def _ids_for_r2(self, r1, filter_ids=True):
 
         # For speed, you might want to consider only cases where an event has occured for depth 2
-        ids_for_depth2 = r1[r1["confidence (X -> Event)"] > 0]["id"]
+        # (only possible when an event class is set)
+        filter_ids = filter_ids and "confidence (X -> Event)" in r1
+        if filter_ids:
+            ids_for_depth2 = set(r1[r1["confidence (X -> Event)"] > 0]["id"])
 
-        uniqe_column_list_of_lists = []
-        for col in self.primed_data.iloc[:,:-1]:  # we dont want column "y" to be added into this
-            uniqe_column_list_of_lists.append(self.primed_data[col].unique())
+        # we dont want column "y" to be added into this
+        uniqe_column_list_of_lists = list(self.column_primes[:-1])
 
         new_ids = []
 
@@ -124,6 +203,78 @@ class PrimeMBA(object):
                             new_ids.append([i,j])
         return new_ids
 
+    def plan(self, depth=1, optimise_y_true=True, memory_budget=None):
+        """
+        Count the candidate rules that `train` would evaluate at each depth,
+        and estimate its memory footprint, without computing any products.
+
+        The support of every 1-itemset (and its co-occurrence with the event
+        class) is computed in one pass over the encoded columns; the number of
+        depth 2 candidates follows exactly from the pairs of columns.
+
+        :param depth: the maximum size of the set for which support will be calculated
+        :type depth: int
+        :param optimise_y_true: as for `train`
+        :type optimise_y_true: bool
+        :param memory_budget: memory available, in bytes (optional)
+        :type memory_budget: int
+        :returns: a dict of "item_supports", "levels" (estimated "candidates"
+            and "memory" at each "depth"), total "candidates" and "memory",
+            and whether the run "fits" in the memory budget (if given)
+        """
+        encoded = self._encode()
+        n_objs = self.n_objs
+        n_rows = encoded[-1][2].size
+        n_classes = encoded[-1][1].size
+
+        # one pass over the columns for item (and item, event) counts
+        is_event = None
+        if self.event is not None:
+            labels = encoded[-1][1]
+            event_code = np.flatnonzero(labels == str(self.event))[0]
+            is_event = encoded[-1][2] == event_code
+
+        supports, n_values = [], []
+        for _, uniques, codes in encoded:
+            counts = np.bincount(codes, weights=self.weights,
+                                 minlength=uniques.size)
+            supports.append(counts / n_objs)
+            if optimise_y_true and is_event is not None:
+                with_event = np.bincount(codes[is_event],
+                                         minlength=uniques.size)
+                n_values.append(np.count_nonzero(with_event))
+            else:
+                n_values.append(uniques.size)
+
+        candidates = [sum(uniques.size for _, uniques, _ in encoded)]
+        if depth == 2:
+            # every pair of values from two different feature columns
+            a = np.array(n_values[:-1], dtype="float64")
+            candidates.append(int(a.sum() ** 2 - (a ** 2).sum()) // 2)
+
+        row_bytes = CANDIDATE_BYTES + CANDIDATE_CLASS_BYTES * n_classes
+        base = n_rows * (8 + sum(codes.itemsize for _, _, codes in encoded))
+        if self.weights is not None:
+            base += n_rows * self.weights.itemsize
+        levels = []
+        for d, n in enumerate(candidates):
+            # the counting pass works on chunks of at most 2 ** 22 cells
+            chunk = min(n_rows * max(n, n_classes), 2 ** 22) * 16
+            levels.append({
+                "depth": d + 1,
+                "candidates": n,
+                "memory": n * row_bytes + chunk,
+            })
+
+        memory = base + sum(level["memory"] for level in levels)
+        return {
+            "item_supports": np.concatenate(supports),
+            "levels": levels,
+            "candidates": sum(candidates),
+            "memory": memory,
+            "fits": None if memory_budget is None else memory <= memory_budget,
+        }
+
     def train(self, depth=1, optimise_y_true=True):
         """
         Calculate the support and confidence using the novel prime number
@@ -145,9 +296,14 @@ class PrimeMBA(object):
         r1["rule"] = r1["id"].replace(to_replace=prime_list, value=F_unique)
         r1["depth"] = 1
 
-        id_event = np.array(prime_list)[F_unique=="y=True"][0]
+        is_class = np.char.startswith(F_unique.astype(str), "y=")
+        class_ids = dict(zip(F_unique[is_class],
+                             np.array(prime_list)[is_class]))
+        id_event = None
+        if self.event is not None:
+            id_event = class_ids["y={}".format(self.event)]
 
-        r1 = self._MBA_calc(r1, prod, id_event)
+        r1 = self._MBA_calc(r1, prod, id_event, class_ids)
         if depth ==1:
             self.rule_df = r1
         elif depth == 2:
@@ -159,7 +315,7 @@ class PrimeMBA(object):
                 r2["rule"] = r2[0] + " and " +  r2[1]
                 r2 = r2.drop(columns=[0, 1])
                 r2["depth"] = 2
-                r2 = self._MBA_calc(r2, prod, id_event)
+                r2 = self._MBA_calc(r2, prod, id_event, class_ids)
                 self.rule_df = pd.concat([r1, r2], ignore_index=True)
         else:
             # TODO: not supported!
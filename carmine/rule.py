@@ -7,8 +7,9 @@ from __future__ import (
     unicode_literals
 )
 
+import itertools
 import math
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 
 class Rule(object):
@@ -97,6 +98,128 @@ class RuleList(object):
             if rule not in self.rules:
                 self.add(rule)
 
+    def remove_redundant(self, max_enumerated_conditions=10):
+        """
+        Remove every rule subsumed by a more general rule, i.e. one whose
+        conditions are a proper subset of its own, that predicts the same
+        class with equal or higher purity.
+
+        Rules are indexed by their set of conditions, so the generalisations
+        of a rule are found by looking up each subset of its conditions. For
+        rules with more than `max_enumerated_conditions` conditions, an
+        inverted index from conditions to rules is used instead.
+
+        Arguments:
+            max_enumerated_conditions (int): Largest rule for which subsets
+                of conditions are enumerated (default: 10).
+        """
+        conditions = {}
+        best = defaultdict(dict)
+        for rule in self.rules:
+            conds = frozenset(
+                (feat, rel, val)
+                for feat, rule_part in rule.conditions.items()
+                for rel, val in rule_part
+            )
+            conditions[rule] = conds
+            purity = best[conds].get(rule.classification)
+            if purity is None or rule.purity > purity:
+                best[conds][rule.classification] = rule.purity
+
+        postings = None
+        redundant = set()
+        for rule, conds in conditions.items():
+            if len(conds) <= max_enumerated_conditions:
+                general = (
+                    frozenset(subset)
+                    for k in range(1, len(conds))
+                    for subset in itertools.combinations(conds, k)
+                )
+            else:
+                if postings is None:
+                    postings = defaultdict(list)
+                    for other in best:
+                        for cond in other:
+                            postings[cond].append(other)
+                shared = Counter(
+                    other for cond in conds for other in postings[cond])
+                general = (
+                    other for other, n in shared.items()
+                    if n == len(other) < len(conds)
+                )
+
+            for other in general:
+                purity = best.get(other, {}).get(rule.classification)
+                if purity is not None and purity >= rule.purity:
+                    redundant.add(rule)
+                    break
+
+        self.rules -= redundant
+
+    def evaluate(self, X, y, feature_names=None, classes=None):
+        """
+        Measure every rule in the rule set against a (new) labelled dataset.
+
+        The data is indexed once as packed row bitmaps for each (feature,
+        value) pair used by the rules, so each rule only costs a few bitwise
+        operations over the rows. Rules are returned in order of `score`.
+
+        Arguments:
+            X (:obj:`numpy.array`): An array containing a categorical dataset.
+            y (:obj:`numpy.array`): An array containing class labels.
+            feature_names (:obj:`list`): Names of the features, as used in
+                rule conditions (default: column indices as strings).
+            classes (:obj:`list`): Class labels, indexed by the rules'
+                classifications, for rules that carry class indices (such as
+                `DecisionTreeRuleExtractor.classes`) (default: None).
+
+        Returns:
+            dict: Columns of per-rule results: "rule", "class", "matches"
+                (objects matching the conditions), "coverage" (matches as a
+                proportion of all objects), "support" (objects matching the
+                conditions and the class, as a proportion of all objects),
+                "confidence" and "lift".
+
+        Raises:
+            ValueError: If a rule predicts a class that isn't in `y` (or,
+                with `classes`, isn't a class index).
+        """
+        import numpy as np
+        from carmine.coverage import CoverageIndex, rule_classes
+
+        y = np.asarray(y).ravel()
+        index = CoverageIndex(X, feature_names)
+        n_objs = max(1, index.n_objs)
+        rules = sorted(self.rules, key=lambda rule: rule.score, reverse=True)
+        labels = rule_classes(rules, y, classes)
+
+        class_bitmaps = {}
+        matches = np.zeros(len(rules), dtype="int64")
+        correct = np.zeros(len(rules), dtype="int64")
+        priors = np.zeros(len(rules))
+        for i, (rule, cls) in enumerate(zip(rules, labels)):
+            if cls not in class_bitmaps:
+                is_class = (y == cls)
+                class_bitmaps[cls] = (index.pack(is_class), is_class.mean())
+            class_bitmap, priors[i] = class_bitmaps[cls]
+            covered = index.rule(rule)
+            matches[i] = index.count(covered)
+            correct[i] = index.count(covered & class_bitmap)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            confidence = correct / matches
+            lift = confidence / priors
+
+        return {
+            "rule": rules,
+            "class": labels,
+            "matches": matches,
+            "coverage": matches / n_objs,
+            "support": correct / n_objs,
+            "confidence": confidence,
+            "lift": lift,
+        }
+
     def to_list(self, filter_func=None):
         # sort current rule state
         rules = sorted(self.rules, key=lambda rule: rule.score, reverse=True)
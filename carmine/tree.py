@@ -7,50 +7,98 @@ from __future__ import (
     unicode_literals
 )
 
-from sklearn.feature_extraction import DictVectorizer
+import numpy as np
+from scipy import sparse
 from sklearn.tree import DecisionTreeClassifier
 
+from carmine.data import as_columns, compress_rows
 from carmine.rule import Rule, RuleList
 
 
 class DecisionTreeRuleExtractor(object):
     def __init__(self, X, y, feature_names=None,
-                 include_negations=True, class_names=None):
+                 include_negations=True, class_names=None, compress=False):
         # prepare dataset
+        X = as_columns(X)
         if not feature_names:
-            feature_names = [str(i) for i in range(X.shape[1])]
+            feature_names = X.feature_names()
         self.X, self.y, fv = self._preprocess_dataset(X, y, feature_names)
         self.features_values = fv
+        self.weights = None
+        if compress:
+            self._compress()
         self.class_names = class_names
+        self.classes = None
         self.include_negations = include_negations
 
-    def __matrix_to_dict(self, X, feature_names):
-        assert len(feature_names) == X.shape[1]
-        for i in range(X.shape[0]):
-            row = X[i, :]
-            d = {feature_names[j]: str(row[j])
-                 for j in range(X.shape[1])}
-            yield d
-
     def _preprocess_dataset(self, X, y, feature_names):
-        dictionaries = list(self.__matrix_to_dict(X, feature_names))
-        dv = DictVectorizer(sparse=True)
-        X = dv.fit_transform(dictionaries)
+        """
+        One-hot encode a categorical dataset into a sparse matrix, one column
+        at a time, with "feature=value" columns in the same (sorted) order as
+        `sklearn.feature_extraction.DictVectorizer` would produce.
+        """
+        assert len(feature_names) == X.n_cols
+
+        # encode each column straight into the (int32) index matrix,
+        # collecting its "feature=value" names
+        names = []
+        indices = np.empty((X.n_rows, X.n_cols), dtype="int32")
+        for i, (feature, column) in enumerate(zip(feature_names, X)):
+            uniques, inverse = np.unique(np.asarray(column).astype(str),
+                                         return_inverse=True)
+            indices[:, i] = inverse.reshape(-1)
+            indices[:, i] += len(names)
+            names.extend("{}={}".format(feature, u) for u in uniques)
+
+        # remap each one-hot column to its position in sorted order, in place
+        order = np.argsort(names, kind="mergesort")
+        position = np.empty(len(names), dtype="int32")
+        position[order] = np.arange(len(names), dtype="int32")
+        for i in range(X.n_cols):
+            indices[:, i] = position[indices[:, i]]
+        indices.sort(axis=1)
+
+        # float32 is the tree's own dtype, which saves a conversion on fitting
+        indptr = np.arange(0, X.n_rows * X.n_cols + 1, X.n_cols)
+        data = np.ones(indices.size, dtype="float32")
+        X = sparse.csr_matrix((data, indices.ravel(), indptr),
+                              shape=(X.n_rows, len(names)))
 
         # transform data
-        y = y.ravel()  # ensure data is 1-dimensional
-        features_values = [v.split("=") for v in dv.feature_names_]
+        y = np.asarray(y).ravel()  # ensure data is 1-dimensional
+        features_values = [names[i].split("=") for i in order]
 
         return (X, y, features_values)
 
+    def _compress(self):
+        """
+        Collapse identical rows (and labels) of the one-hot encoded dataset
+        into unique rows, weighted by the number of times they occur, which
+        are fitted as sample weights. Note that `min_samples_split` and
+        `min_samples_leaf` then count unique rows; use
+        `min_weight_fraction_leaf` to constrain leaves by objects instead.
+        """
+        # every row has one (sorted) one-hot column per feature
+        labels, y = np.unique(self.y, return_inverse=True)
+        n_cols = self.X.indptr[1]
+        X = self.X.indices.reshape(-1, n_cols)
+        X, y, self.weights = compress_rows(X, y.reshape(-1))
+
+        indptr = np.arange(0, X.size + 1, n_cols)
+        data = np.ones(X.size, dtype="float32")
+        self.X = sparse.csr_matrix((data, X.ravel(), indptr),
+                                   shape=(X.shape[0], self.X.shape[1]))
+        self.y = labels[y]
+
     def train(self, **kwargs):
         # construct decision tree
         tree = DecisionTreeClassifier(**kwargs)
-        tree.fit(self.X, self.y)
+        tree.fit(self.X, self.y, sample_weight=self.weights)
 
         # extract rules
         self.tree = tree.tree_
-        self.total_samples = self.tree.value.max(axis=2).reshape(-1)[0]
+        self.classes = tree.classes_
+        self.total_samples = self.tree.weighted_n_node_samples[0]
         self.rules = self.extract(self.include_negations)
 
     def extract(self, include_negations=True):
@@ -59,7 +107,7 @@ class DecisionTreeRuleExtractor(object):
         """
         rules = RuleList()
         classes = self.tree.value.argmax(axis=2).reshape(-1)
-        samples = self.tree.value
+        samples = self.tree.weighted_n_node_samples
 
         def __recurse(tree, node, rule=Rule()):
             # get left and right child nodes
@@ -95,8 +143,8 @@ class DecisionTreeRuleExtractor(object):
             if len(rule) > 0:
                 rule.classification = class_
                 rule.purity = (1 - impurity)
-                rule.proportion = (samples[node].sum() / self.total_samples)
-                rule.matches = samples[node].sum()
+                rule.proportion = (samples[node] / self.total_samples)
+                rule.matches = samples[node]
                 rule.score = (rule.purity, rule.proportion)
                 rules.add(rule)
 
@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+
+from .context import carmine
+from .context import X
+from .context import y
+
+from carmine.classifier import RuleClassifier
+from carmine.mecr import MECRTree
+from carmine.rule import Rule, RuleList
+
+
+class TestRuleClassifier(unittest.TestCase):
+    def test_train_from_mecr_rules(self):
+        m = MECRTree(X, y)
+        m.train(0.1, 0.5)
+        c = RuleClassifier(m.rules)
+        c.train(X, y)
+        self.assertGreater(len(c.rules), 0)
+        self.assertLessEqual(len(c.rules), len(m.rules))
+        self.assertIn(c.default_class, [0, 1])
+
+        predictions = c.predict(X)
+        self.assertEqual(predictions.shape, y.shape)
+        self.assertEqual(np.sum(predictions != y), c.errors)
+
+    def test_train_from_tree_rules(self):
+        t = carmine.DecisionTreeRuleExtractor(X, y)
+        t.train()
+        c = RuleClassifier(t.rules)
+        c.train(X, y)
+        self.assertEqual(np.sum(c.predict(X) != y), c.errors)
+
+    def test_tree_rules_with_string_labels(self):
+        labels = np.where(y == 1, "fault", "ok")
+        t = carmine.DecisionTreeRuleExtractor(X, labels)
+        t.train()
+        c = RuleClassifier(t.rules)
+        # tree rules carry class indices, which aren't labels in y
+        with self.assertRaises(ValueError):
+            c.train(X, labels)
+
+        c.train(X, labels, classes=t.classes)
+        self.assertGreater(len(c.rules), 0)
+        self.assertEqual(set(c.rule_classes) - {"fault", "ok"}, set())
+        self.assertEqual(np.sum(c.predict(X) != labels), c.errors)
+
+    def test_rules_are_ranked_by_score(self):
+        general = Rule({"0": {(Rule.EQ, 3)}})
+        specific = Rule({"0": {(Rule.EQ, 3)}, "1": {(Rule.EQ, 3)}})
+        for rule, score in [(general, (0.6, 0.4)), (specific, (1.0, 0.25))]:
+            rule.classification = 1
+            rule.score = score
+        rules = RuleList()
+        rules.add(general)
+        rules.add(specific)
+
+        c = RuleClassifier(rules)
+        self.assertEqual(c.candidates, [specific, general])
+
+    def test_negated_conditions(self):
+        rule = Rule({"0": {(Rule.NEQ, 1)}, "2": {(Rule.NEQ, 2)}})
+        rule.classification = 1
+        rule.score = (0.67, 0.25)
+        rules = RuleList()
+        rules.add(rule)
+
+        c = RuleClassifier(rules)
+        c.train(X, y)
+        self.assertEqual(c.rules, [rule])
+        np.testing.assert_array_equal(c.predict(X)[[1, 2, 3]], [0, 1, 1])
+        self.assertEqual(c.errors, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from .context import carmine
+from .context import X
+from .context import y
+
+from carmine.data import Columns, compress_rows
+
+
+class TestColumns(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        path = os.path.join(self.tmp, "X.dat")
+        self.memmap = np.memmap(path, dtype=X.dtype, mode="w+", shape=X.shape)
+        self.memmap[:] = X
+        self.df = pd.DataFrame(X, columns=["a", "b", "c"])
+
+    def tearDown(self):
+        del self.memmap
+        shutil.rmtree(self.tmp)
+
+    def test_array_columns_are_views(self):
+        for data in [X, self.memmap]:
+            columns = Columns(data)
+            self.assertEqual(columns.shape, X.shape)
+            self.assertIsNone(columns.names)
+            self.assertTrue(np.shares_memory(columns.column(1), data))
+            self.assertEqual(columns.feature_names(), ["0", "1", "2"])
+
+    def test_named_columns(self):
+        mapping = {"a": X[:, 0], "b": X[:, 1], "c": X[:, 2]}
+        for data in [self.df, mapping]:
+            columns = Columns(data)
+            self.assertEqual(columns.shape, X.shape)
+            self.assertEqual(columns.feature_names(), ["a", "b", "c"])
+            np.testing.assert_array_equal(columns.column(2), X[:, 2])
+
+    def _mecr_rules(self, data):
+        m = carmine.MECRTree(data, y, feature_names=["a", "b", "c"])
+        m.train(0.1, 0.5)
+        return sorted(str(r) for r in m.rules.to_list())
+
+    def test_miners_accept_columnar_input(self):
+        expected = self._mecr_rules(X)
+        for data in [self.memmap, self.df]:
+            self.assertEqual(self._mecr_rules(data), expected)
+
+        m = carmine.MECRTree(self.df, pd.Series(y))
+        self.assertEqual(m.X.dtype, np.uint8)
+        self.assertEqual(list(m.feature_names), ["a", "b", "c"])
+
+        expected = carmine.PrimeMBA(X, y, feature_names=["a", "b", "c"])
+        expected.train(depth=1)
+        for data in [self.memmap, self.df]:
+            p = carmine.PrimeMBA(data, pd.Series(y),
+                                 feature_names=["a", "b", "c"])
+            p.train(depth=1)
+            pd.testing.assert_frame_equal(p.rule_df, expected.rule_df)
+
+        t = carmine.DecisionTreeRuleExtractor(self.df, y)
+        self.assertEqual(t.X.shape, (X.shape[0], 8))
+        self.assertEqual(t.features_values[0], ["a", "1"])
+
+
+class TestCompressRows(unittest.TestCase):
+    # duplicated rows, with different multiplicities
+    X_dup = np.vstack([X, X, X[:3]])
+    y_dup = np.concatenate([y, y, y[:3]])
+
+    def test_compress_rows(self):
+        X_c, y_c, weights = compress_rows(self.X_dup, self.y_dup)
+        # rows 3 and 5 of the dataset are identical
+        self.assertEqual(X_c.shape, (7, 3))
+        self.assertEqual(X_c.dtype, X.dtype)
+        self.assertEqual(weights.sum(), self.X_dup.shape[0])
+        self.assertEqual(sorted(weights), [2, 2, 2, 3, 3, 3, 4])
+        for row, label, weight in zip(X_c, y_c, weights):
+            same = (self.X_dup == row).all(axis=1) & (self.y_dup == label)
+            self.assertEqual(same.sum(), weight)
+
+    def test_compressed_mecr_matches_uncompressed(self):
+        full = carmine.MECRTree(self.X_dup, self.y_dup)
+        compressed = carmine.MECRTree(self.X_dup, self.y_dup, compress=True)
+        self.assertEqual(compressed.X.shape[0], 7)
+        for m in [full, compressed]:
+            m.train(0.1, 0.5)
+        self.assertEqual(set(compressed.rules), set(full.rules))
+
+        for m in [full, compressed]:
+            m.train_top_k(5, min_support=0.1)
+        self.assertEqual(set(compressed.rules), set(full.rules))
+
+        plan, expected = compressed.plan(0.1), full.plan(0.1)
+        np.testing.assert_allclose(plan["item_supports"],
+                                   expected["item_supports"])
+        self.assertEqual(
+            [level["candidates"] for level in plan["levels"]],
+            [level["candidates"] for level in expected["levels"]])
+
+        n = self.X_dup.shape[0]
+        for m in [full, compressed]:
+            m.train(0.1, 0.5, sample_size=n, random_state=0)
+        self.assertEqual(set(compressed.rules), set(full.rules))
+
+    def test_compressed_prime_matches_uncompressed(self):
+        full = carmine.PrimeMBA(self.X_dup, self.y_dup)
+        compressed = carmine.PrimeMBA(self.X_dup, self.y_dup, compress=True)
+        for m in [full, compressed]:
+            m.train(depth=2, optimise_y_true=False)
+        pd.testing.assert_frame_equal(compressed.rule_df, full.rule_df,
+                                      check_dtype=False)
+        np.testing.assert_allclose(compressed.plan()["item_supports"],
+                                   full.plan()["item_supports"])
+
+    def test_compressed_tree_matches_uncompressed(self):
+        full = carmine.DecisionTreeRuleExtractor(self.X_dup, self.y_dup)
+        compressed = carmine.DecisionTreeRuleExtractor(
+            self.X_dup, self.y_dup, compress=True)
+        self.assertEqual(compressed.X.shape, (7, full.X.shape[1]))
+        for t in [full, compressed]:
+            t.train(random_state=0)
+        self.assertEqual(compressed.rules.to_list(), full.rules.to_list())
+        for rule in full.rules.to_list():
+            self.assertLessEqual(rule["proportion"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 
 from .context import carmine
 from .context import X
@@ -6,6 +7,7 @@ from .context import y
 
 from carmine.mecr import Node
 from carmine.mecr import MECRTree
+from carmine.mecr import _sample_counts
 
 
 class TestNode(unittest.TestCase):
@@ -23,6 +25,24 @@ class TestNode(unittest.TestCase):
         self.assertGreater(len(child.matches), 0)
         self.assertEqual(sorted(child.matches)[0], 3)
 
+    def test_child_itemset(self):
+        i = Node(X, y, matches=[0, 1, 6], items=[(0, 1)])
+        j = Node(X, y, matches=[0, 4], items=[(1, 1)])
+        child = i.create_child(j)
+        self.assertEqual(child.items, ((0, 1), (1, 1)))
+        self.assertEqual(child.attrs, 0b11)
+        self.assertEqual(child.matches, {0})
+        self.assertEqual(list(child.values.mask), [False, False, True])
+
+    def test_no_child_for_conflicting_values(self):
+        i = Node(X, y, matches=[0, 1, 6], items=[(0, 1)])
+        j = Node(X, y, matches=[2, 7], items=[(0, 2)])
+        self.assertIsNone(i.create_child(j))
+
+        k = Node(X, y, matches=[0], items=[(0, 1), (1, 1)])
+        l = Node(X, y, matches=[2], items=[(0, 2), (2, 1)])
+        self.assertIsNone(k.create_child(l))
+
 
 class TestMECRTree(unittest.TestCase):
     def test_construct_root_node(self):
@@ -77,6 +97,254 @@ class TestMECRTree(unittest.TestCase):
         for rule in m.rules:
             self.assertGreaterEqual(rule.purity, min_confidence)
 
+    def _assert_pruning_only_drops_redundant_rules(self, X, y, *thresholds):
+        full = MECRTree(X, y)
+        full.train(*thresholds, prune=False)
+        pruned = MECRTree(X, y)
+        pruned.train(*thresholds, prune=True)
+
+        kept = set(pruned.rules)
+        self.assertTrue(kept.issubset(set(full.rules)))
+        for rule in set(full.rules) - kept:
+            general = [
+                r for r in kept
+                if r.purity == 1.0 and
+                r.classification == rule.classification and
+                all(rule.conditions[f] == c for f, c in r.conditions.items())
+            ]
+            self.assertGreater(len(general), 0)
+
+    def test_pruning_matches_unpruned_rules(self):
+        self._assert_pruning_only_drops_redundant_rules(X, y, 0.1, 0.5)
+        self._assert_pruning_only_drops_redundant_rules(X, y, 0.0, 0.0)
+
+    def test_pruning_on_pure_data(self):
+        rng = np.random.RandomState(0)
+        X_pure = rng.randint(0, 3, size=(200, 5))
+        y_pure = (X_pure[:, 0] == 0).astype(int)
+        self._assert_pruning_only_drops_redundant_rules(
+            X_pure, y_pure, 0.01, 0.8)
+
+    def _assert_top_k(self, X, y, k, metric):
+        full = MECRTree(X, y)
+        full.train(0.0, 0.0)
+        if metric == "confidence":
+            key = lambda r: (r.purity, r.proportion)
+        else:
+            key = lambda r: (r.proportion, r.purity)
+        expected = sorted([key(r) for r in full.rules], reverse=True)[:k]
+
+        m = MECRTree(X, y)
+        m.train_top_k(k, metric=metric)
+        self.assertEqual(len(m.rules), k)
+        self.assertEqual(sorted([key(r) for r in m.rules], reverse=True),
+                         expected)
+
+    def test_train_top_k(self):
+        self._assert_top_k(X, y, 3, "confidence")
+        self._assert_top_k(X, y, 5, "support")
+
+    def test_train_top_k_prunes_on_pure_data(self):
+        rng = np.random.RandomState(0)
+        X_pure = rng.randint(0, 3, size=(200, 5))
+        y_pure = (X_pure[:, 0] == 0).astype(int)
+        self._assert_top_k(X_pure, y_pure, 10, "confidence")
+        self._assert_top_k(X_pure, y_pure, 10, "support")
+
+    def test_train_top_k_unknown_metric(self):
+        m = MECRTree(X, y)
+        with self.assertRaises(ValueError):
+            m.train_top_k(3, metric="lift")
+
+    def _summaries(self, rules):
+        return sorted((r["conditions"], r["class"], r["purity"],
+                       r["proportion"]) for r in rules.to_list())
+
+    def test_cached_train_matches_fresh_train(self):
+        m = MECRTree(X, y)
+        m.train(0.1, 0.3)
+        m.train(0.25, 0.6)
+        self.assertIsNone(m.root)
+
+        fresh = MECRTree(X, y, cache_size=None)
+        fresh.train(0.25, 0.6)
+        self.assertIsNotNone(fresh.root)
+        self.assertEqual(self._summaries(m.rules),
+                         self._summaries(fresh.rules))
+        self.assertEqual(self._summaries(m.query(0.25, 0.6)),
+                         self._summaries(fresh.rules))
+
+    def test_query_needs_lower_support_run(self):
+        m = MECRTree(X, y)
+        m.train(0.25, 0.6)
+        m.query(0.3, 0.6)
+        with self.assertRaises(KeyError):
+            m.query(0.1, 0.6)
+        with self.assertRaises(KeyError):
+            m.query(0.3, 0.6, prune=True)
+
+        # a lower support run replaces the cached one
+        m.train(0.1, 0.6)
+        self.assertEqual(len(m.cache.entries), 1)
+
+    def test_cache_eviction(self):
+        m = MECRTree(X, y, cache_size=30)
+        m.train(0.1, 0.5, prune=True)
+        m.train(0.1, 0.5, prune=False)
+        self.assertLessEqual(len(m.cache), 30)
+        self.assertEqual(list(m.cache.entries), [(False, None, 0.1)])
+
+    def test_plan(self):
+        m = MECRTree(X, y)
+        plan = m.plan(0.25)
+        self.assertEqual(len(plan["levels"]), X.shape[1])
+        self.assertEqual(len(plan["item_supports"]), 8)
+        self.assertAlmostEqual(plan["item_supports"][0], 0.25)
+        self.assertGreater(plan["levels"][0]["candidates"], 0)
+        self.assertIsNone(plan["suggested_min_support"])
+
+        # estimates shrink as support grows
+        self.assertLessEqual(m.plan(0.5)["memory"], plan["memory"])
+
+    def test_plan_suggests_min_support(self):
+        rng = np.random.RandomState(0)
+        X_big = rng.randint(0, 3, size=(2000, 6))
+        y_big = (rng.rand(2000) < 0.3).astype(int)
+        m = MECRTree(X_big, y_big)
+        budget = m.plan(0.05)["memory"]
+        plan = m.plan(0.001, memory_budget=budget)
+        self.assertGreater(plan["memory"], budget)
+        self.assertGreater(plan["suggested_min_support"], 0.001)
+        self.assertLessEqual(plan["suggested_min_support"], 0.05)
+        self.assertLessEqual(
+            m.plan(plan["suggested_min_support"])["memory"], budget)
+
+    def test_target_class(self):
+        rng = np.random.RandomState(0)
+        X_big = rng.randint(0, 3, size=(1000, 5))
+        y_big = np.where(rng.rand(1000) < 0.1, "fault", "ok")
+        y_big[(X_big[:, 0] == 0) & (X_big[:, 1] == 0)] = "fault"
+
+        full = MECRTree(X_big, y_big, cache_size=None)
+        full.train(0.02, 0.3, prune=False)
+        expected = [(r["conditions"], r["purity"], r["proportion"])
+                    for r in full.rules.to_list() if r["class"] == "fault"]
+
+        targeted = MECRTree(X_big, y_big, cache_size=None)
+        targeted.train(0.02, 0.5, prune=False, target_class="fault")
+        rules = targeted.rules.to_list()
+        self.assertGreater(len(rules), 0)
+        self.assertEqual(set(r["class"] for r in rules), {"fault"})
+        self.assertEqual(
+            sorted((r["conditions"], r["purity"], r["proportion"])
+                   for r in rules),
+            sorted(e for e in expected if e[1] >= 0.5))
+
+        # rules below 50% confidence are measured for the target class
+        targeted.train(0.02, 0.3, prune=False, target_class="fault")
+        for rule in targeted.rules:
+            self.assertEqual(rule.classification, "fault")
+            self.assertGreaterEqual(rule.purity, 0.3)
+            self.assertGreaterEqual(rule.proportion, 0.02)
+
+    def test_target_class_from_cache(self):
+        m = MECRTree(X, y)
+        m.train(0.1, 0.5)
+        rules = m.query(0.1, 0.5, target_class=1)
+        self.assertEqual(set(r.classification for r in rules), {1})
+
+        m.train(0.1, 0.5, target_class=1)
+        self.assertIsNone(m.root)
+        self.assertEqual(set(m.rules), set(rules))
+
+        fresh = MECRTree(X, y)
+        fresh.train(0.1, 0.5, target_class=1)
+        self.assertEqual(set(fresh.rules), set(rules))
+        with self.assertRaises(KeyError):
+            fresh.query(0.1, 0.5, target_class=0)
+
+    def test_approximate_matches_exact_on_full_sample(self):
+        exact = MECRTree(X, y)
+        exact.train(0.25, 0.6)
+        approx = MECRTree(X, y)
+        approx.train(0.25, 0.6, sample_size=X.shape[0], random_state=0)
+        self.assertEqual(set(approx.rules), set(exact.rules))
+        self.assertEqual(approx.approximation["sample_size"], X.shape[0])
+        self.assertAlmostEqual(approx.approximation["per_rule_confidence"],
+                               0.95)
+
+    def test_approximate_matches_exact_on_noisy_data(self):
+        # nodes that look pure in the sample but aren't in the full data
+        # must still be extended
+        rng = np.random.RandomState(0)
+        X_big = rng.randint(0, 3, size=(5000, 5))
+        y_big = (X_big[:, 0] == 0).astype(int)
+        flip = rng.rand(5000) < 0.002
+        y_big[flip] = 1 - y_big[flip]
+        for prune in [False, True]:
+            exact = MECRTree(X_big, y_big)
+            exact.train(0.02, 0.95, prune=prune)
+            approx = MECRTree(X_big, y_big)
+            approx.train(0.02, 0.95, sample_size=1000, random_state=0,
+                         prune=prune)
+            self.assertEqual(set(approx.rules), set(exact.rules))
+
+    def test_approximate_matches_exact_with_near_duplicate_column(self):
+        # column 1 only differs from column 0 on a few rows, which a sample
+        # may not contain, so itemsets with and without it can match the
+        # same sampled objects
+        rng = np.random.RandomState(0)
+        a = rng.randint(0, 2, 20000)
+        b = np.where(rng.rand(20000) < 0.003, 1 - a, a)
+        X_big = np.column_stack([a, b, rng.randint(0, 2, 20000)])
+        y_big = np.where(rng.rand(20000) < 0.1, 1 - a, a)
+        exact = MECRTree(X_big, y_big)
+        exact.train(0.05, 0.5)
+        for seed in range(5):
+            approx = MECRTree(X_big, y_big)
+            approx.train(0.05, 0.5, sample_size=1000, random_state=seed)
+            self.assertEqual(set(approx.rules), set(exact.rules))
+
+    def test_sample_counts(self):
+        rng = np.random.RandomState(0)
+        weights = np.array([1, 5, 2, 10, 1, 1, 30])
+        total = np.zeros(weights.size)
+        for _ in range(2000):
+            counts = _sample_counts(rng, weights, 12)
+            self.assertEqual(counts.sum(), 12)
+            self.assertTrue((counts <= weights).all())
+            total += counts
+        # every object is equally likely to be sampled
+        np.testing.assert_allclose(total / 2000, 12 * weights / weights.sum(),
+                                   atol=0.15)
+        np.testing.assert_array_equal(_sample_counts(rng, weights, 100),
+                                      weights)
+
+    def test_stratified_sample_of_collapsed_rows(self):
+        rng = np.random.RandomState(0)
+        X_big = rng.randint(0, 2, size=(20000, 3))
+        y_big = X_big[:, 0] ^ (rng.rand(20000) < 0.1)
+        m = MECRTree(X_big, y_big, compress=True)
+        samples = m._stratified_sample(4000, random_state=0)
+        self.assertEqual([w.sum() for _, w in samples], [1000, 2000, 4000])
+        for (rows, weights), (bigger, bigger_weights) in zip(samples,
+                                                             samples[1:]):
+            self.assertTrue((weights <= m.weights[rows]).all())
+            larger = dict(zip(bigger, bigger_weights))
+            for row, weight in zip(rows, weights):
+                self.assertLessEqual(weight, larger[row])
+
+    def test_approximate_rules_meet_thresholds(self):
+        rng = np.random.RandomState(0)
+        X_big = rng.randint(0, 3, size=(5000, 4))
+        y_big = (X_big[:, 0] == 1).astype(int)
+        m = MECRTree(X_big, y_big)
+        m.train(0.1, 0.9, sample_size=2000, random_state=0)
+        self.assertGreater(len(m.rules), 0)
+        for rule in m.rules:
+            self.assertGreaterEqual(rule.proportion, 0.1)
+            self.assertGreaterEqual(rule.purity, 0.9)
+
 
 if __name__ == "__main__":
     unittest.main()
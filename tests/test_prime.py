@@ -94,6 +94,46 @@ class Test_PrimeMBA(unittest.TestCase):
 
         self.assertFalse(df.empty)
 
+    def test_train_multi_class(self):
+        labels = np.array(["a", "b", "c", "a", "b", "c", "a", "a"])
+        m = PrimeMBA(X, labels)
+        m.train(depth=1)
+        df = m.rule_df.set_index("rule")
+
+        self.assertNotIn("confidence (X -> Event)", df.columns)
+        for c in ["a", "b", "c"]:
+            for x in ["support (X, y=", "confidence (X -> y=", "lift (X -> y="]:
+                self.assertIn(x + c + ")", df.columns)
+
+        # "0=1" matches rows 0, 1 and 6, labelled a, b and a
+        self.assertEqual(df.loc["0=1", "matches"], 3)
+        self.assertAlmostEqual(df.loc["0=1", "confidence (X -> y=a)"], 2 / 3)
+        self.assertAlmostEqual(df.loc["0=1", "confidence (X -> y=b)"], 1 / 3)
+        self.assertAlmostEqual(df.loc["0=1", "lift (X -> y=a)"], 4 / 3)
+
+        confidences = df[["confidence (X -> y={})".format(c)
+                          for c in ["a", "b", "c"]]].sum(axis=1)
+        np.testing.assert_allclose(confidences, 1.0)
+
+    def test_event_matches_binary_labels(self):
+        m = PrimeMBA(X, y)
+        m.train(depth=1)
+        df = m.rule_df.set_index("rule")
+        # "1=3" matches rows 3, 5 and 6, which are all labelled 1
+        self.assertAlmostEqual(df.loc["1=3", "confidence (X -> Event)"], 1.0)
+        self.assertAlmostEqual(df.loc["1=3", "confidence (X -> y=True)"], 1.0)
+
+    def test_plan_counts_candidates(self):
+        for optimise_y_true in [True, False]:
+            m = PrimeMBA(X, y)
+            plan = m.plan(depth=2, optimise_y_true=optimise_y_true,
+                          memory_budget=10 ** 9)
+            m.train(depth=2, optimise_y_true=optimise_y_true)
+            counts = m.rule_df["depth"].value_counts()
+            self.assertEqual(plan["levels"][0]["candidates"], counts[1])
+            self.assertEqual(plan["levels"][1]["candidates"], counts[2])
+            self.assertTrue(plan["fits"])
+        self.assertEqual(len(plan["item_supports"]), counts[1])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+import subprocess
+import sys
+import unittest
+import numpy as np
+
+from .context import up_path
+from .context import carmine
+from .context import X
+from .context import y
+
+from carmine.rule import Rule, RuleList
+
+
+class TestLazyImports(unittest.TestCase):
+    def _loaded_modules(self, statement):
+        code = "{}; import sys; print(' '.join(sys.modules))".format(statement)
+        out = subprocess.check_output([sys.executable, "-c", code],
+                                      cwd=up_path)
+        return set(out.decode("utf-8").split())
+
+    @unittest.skipIf(sys.version_info < (3, 7), "needs PEP 562")
+    def test_rules_do_not_import_heavy_dependencies(self):
+        modules = self._loaded_modules("from carmine import Rule, RuleList")
+        for heavy in ["pandas", "sklearn", "sympy", "carmine.mecr"]:
+            self.assertNotIn(heavy, modules)
+
+    def test_miners_are_importable(self):
+        modules = self._loaded_modules("from carmine import MECRTree")
+        self.assertIn("carmine.mecr", modules)
+
+    def test_submodules_are_attributes(self):
+        modules = self._loaded_modules("import carmine; carmine.mecr.Node")
+        self.assertIn("carmine.mecr", modules)
+        modules = self._loaded_modules("import carmine")
+        self.assertNotIn("carmine.mecr", modules)
+
+
+class TestRuleListRemoveRedundant(unittest.TestCase):
+    def _rule(self, conditions, classification, purity):
+        rule = Rule({f: {(Rule.EQ, v)} for f, v in conditions.items()})
+        rule.classification = classification
+        rule.purity = purity
+        rule.score = (purity, 0.1)
+        return rule
+
+    def test_remove_redundant(self):
+        general = self._rule({"a": 1}, 1, 0.9)
+        worse = self._rule({"a": 1, "b": 2}, 1, 0.8)
+        equal = self._rule({"a": 1, "b": 2, "c": 3}, 1, 0.9)
+        better = self._rule({"a": 1, "c": 3}, 1, 0.95)
+        other_class = self._rule({"a": 1, "d": 4}, 0, 0.5)
+        unrelated = self._rule({"b": 2}, 1, 0.1)
+
+        rules = RuleList()
+        for rule in [general, worse, equal, better, other_class, unrelated]:
+            rules.add(rule)
+
+        for max_enumerated in [10, 0]:
+            pruned = RuleList()
+            pruned.merge(rules)
+            pruned.remove_redundant(max_enumerated_conditions=max_enumerated)
+            self.assertEqual(set(pruned),
+                             {general, better, other_class, unrelated})
+
+    def test_remove_redundant_mined_rules(self):
+        m = carmine.MECRTree(X, y)
+        m.train(0.1, 0.5, prune=False)
+        rules = RuleList()
+        rules.merge(m.rules)
+        rules.remove_redundant()
+        self.assertLess(len(rules), len(m.rules))
+        self.assertGreater(len(rules), 0)
+
+
+class TestRuleListEvaluate(unittest.TestCase):
+    def test_evaluate_reproduces_mined_statistics(self):
+        m = carmine.MECRTree(X, y)
+        m.train(0.1, 0.5)
+        result = m.rules.evaluate(X, y)
+        self.assertEqual(len(result["rule"]), len(m.rules))
+        for i, rule in enumerate(result["rule"]):
+            self.assertAlmostEqual(result["confidence"][i], rule.purity)
+            self.assertAlmostEqual(result["support"][i], rule.proportion)
+
+    def test_evaluate_negated_conditions(self):
+        rule = Rule({"0": {(Rule.NEQ, 1)}, "2": {(Rule.NEQ, 2)}})
+        rule.classification = 1
+        rule.score = (1.0, 0.5)
+        rules = RuleList()
+        rules.add(rule)
+
+        # rows 2, 3 and 5 match, labelled 0, 1 and 1
+        result = rules.evaluate(X, y)
+        self.assertEqual(result["matches"][0], 3)
+        self.assertAlmostEqual(result["coverage"][0], 3 / 8)
+        self.assertAlmostEqual(result["support"][0], 2 / 8)
+        self.assertAlmostEqual(result["confidence"][0], 2 / 3)
+        self.assertAlmostEqual(result["lift"][0], (2 / 3) / 0.5)
+
+    def test_evaluate_tree_rules_on_new_data(self):
+        t = carmine.DecisionTreeRuleExtractor(X, y)
+        t.train()
+        X_new, y_new = X[::-1], np.zeros_like(y)
+        result = t.rules.evaluate(X_new, y_new, classes=t.classes)
+        for i, rule in enumerate(result["rule"]):
+            expected = np.ones(X.shape[0], dtype=bool)
+            for feature, rule_part in rule.conditions.items():
+                column = X_new[:, int(feature)].astype(str)
+                for relation, value in rule_part:
+                    if relation == Rule.EQ:
+                        expected &= (column == value)
+                    else:
+                        expected &= (column != value)
+            self.assertEqual(result["matches"][i], expected.sum())
+            if rule.classification != 0:
+                self.assertEqual(result["support"][i], 0)
+
+    def test_evaluate_tree_rules_with_string_labels(self):
+        labels = np.where(y == 1, "fault", "ok")
+        t = carmine.DecisionTreeRuleExtractor(X, labels)
+        t.train()
+        # tree rules carry class indices, which aren't labels in y
+        with self.assertRaises(ValueError):
+            t.rules.evaluate(X, labels)
+
+        result = t.rules.evaluate(X, labels, classes=t.classes)
+        indices = np.searchsorted(t.classes, labels)
+        expected = t.rules.evaluate(X, indices)
+        self.assertEqual(set(result["class"]) - {"fault", "ok"}, set())
+        self.assertGreater(result["support"].sum(), 0)
+        np.testing.assert_allclose(result["confidence"],
+                                   expected["confidence"])
+        np.testing.assert_allclose(result["support"], expected["support"])
+
+
+if __name__ == "__main__":
+    unittest.main()